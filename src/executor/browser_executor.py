@@ -499,7 +499,10 @@ class BrowserExecutor:
                         types.Part.from_bytes(data=screenshot, mime_type="image/png")
                     ])
                 ],
-                config=types.GenerateContentConfig(temperature=0.0)
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    temperature=0.0
+                )
             )
             
             text = gemini_client._safe_extract_text(response)
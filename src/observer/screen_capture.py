@@ -1,19 +1,30 @@
 """Event-driven screen capture for macOS."""
+import os
 import mss
 import mss.tools
 from pathlib import Path
 from typing import Optional, Set
 import time
 import hashlib
+import threading
 from src.utils.logger import setup_logger
 from src.utils.config import config
 
+# Screenshot filename: screen_<timestamp>_<trigger>_<count>.png
+_NAME_TMPL = "screen_%.3f_%s_%d.png"
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+_DIR_FD_SUPPORTED = os.open in os.supports_dir_fd
+
 
 class ScreenCapture:
     """
     Event-driven screen capture.
     
     Takes screenshots on specific triggers rather than at fixed intervals.
+    
+    Safe to call capture() from several threads: each thread gets its own
+    mss handle and dedup/counter state is guarded by a lock.
     """
     
     def __init__(self, output_dir: Path):
@@ -28,8 +39,22 @@ class ScreenCapture:
         self.logger = setup_logger("ScreenCapture")
         
         self.sct = mss.mss()
+        self._local = threading.local()
+        self._local.sct = self.sct
+        self._thread_scts = [self.sct]
+        self._lock = threading.Lock()
+        
+        # Pre-opened directory fd: each screenshot is created relative to it,
+        # skipping the full path lookup on every write
+        self._dir_fd: Optional[int] = None
+        if _DIR_FD_SUPPORTED:
+            try:
+                self._dir_fd = os.open(self.output_dir, os.O_RDONLY)
+            except OSError:
+                self._dir_fd = None
+        
         self._last_capture_time = 0.0
-        self._last_screenshot_hash: Optional[str] = None
+        self._last_screenshot_hash: Optional[bytes] = None
         self._capture_count = 0
         
         # Track which triggers have been processed
@@ -56,6 +81,16 @@ class ScreenCapture:
         
         return False
     
+    def _get_sct(self):
+        """Get the mss handle for the calling thread (mss is not thread-safe)."""
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+            with self._lock:
+                self._thread_scts.append(sct)
+        return sct
+    
     def capture(self, trigger: str, timestamp: float) -> Optional[str]:
         """
         Capture a screenshot if appropriate for the trigger.
@@ -72,29 +107,31 @@ class ScreenCapture:
         
         try:
             # Capture primary monitor
-            monitor = self.sct.monitors[1]
-            screenshot = self.sct.grab(monitor)
-            
-            # Check if screenshot is different from last (avoid duplicates)
-            screenshot_bytes = screenshot.rgb
-            current_hash = hashlib.md5(screenshot_bytes).hexdigest()[:16]
-            
-            if current_hash == self._last_screenshot_hash and trigger != "page_load":
-                self.logger.debug(f"Skipping duplicate screenshot for {trigger}")
-                return None
+            sct = self._get_sct()
+            monitor = sct.monitors[1]
+            screenshot = sct.grab(monitor)
             
-            self._last_screenshot_hash = current_hash
+            # Check if screenshot is different from last (avoid duplicates).
+            # Fingerprint the raw BGRA buffer so duplicates never pay for
+            # the RGB conversion, which is only needed for PNG encoding.
+            current_hash = hashlib.blake2b(screenshot.raw, digest_size=8).digest()
             
-            # Generate filename
-            self._capture_count += 1
-            filename = f"screen_{timestamp:.3f}_{trigger}_{self._capture_count}.png"
-            filepath = self.output_dir / filename
+            with self._lock:
+                if current_hash == self._last_screenshot_hash and trigger != "page_load":
+                    self.logger.debug(f"Skipping duplicate screenshot for {trigger}")
+                    return None
+                
+                self._last_screenshot_hash = current_hash
+                
+                # Generate filename
+                self._capture_count += 1
+                filename = _NAME_TMPL % (timestamp, trigger, self._capture_count)
+                self._last_capture_time = timestamp
             
             # Save screenshot
-            mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(filepath))
+            self._write_file(filename, mss.tools.to_png(screenshot.rgb, screenshot.size))
             
-            self._last_capture_time = timestamp
-            self.logger.debug(f"Captured screenshot: {filename} (trigger: {trigger})")
+            self.logger.debug("Captured screenshot: %s (trigger: %s)", filename, trigger)
             
             return f"screenshots/{filename}"
         
@@ -102,6 +139,20 @@ class ScreenCapture:
             self.logger.error(f"Screenshot capture failed: {e}")
             return None
     
+    def _write_file(self, filename: str, data: bytes):
+        """Write encoded image bytes into output_dir with a single write."""
+        if self._dir_fd is not None:
+            fd = os.open(filename, _WRITE_FLAGS, 0o644, dir_fd=self._dir_fd)
+        else:
+            fd = os.open(self.output_dir / filename, _WRITE_FLAGS, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+    
     def capture_now(self, output_path: Path) -> Optional[Path]:
         """
         Capture a screenshot immediately to a specific path.
@@ -113,8 +164,9 @@ class ScreenCapture:
             Path to saved screenshot or None if failed
         """
         try:
-            monitor = self.sct.monitors[1]
-            screenshot = self.sct.grab(monitor)
+            sct = self._get_sct()
+            monitor = sct.monitors[1]
+            screenshot = sct.grab(monitor)
             mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(output_path))
             return output_path
         except Exception as e:
@@ -135,7 +187,7 @@ class ScreenCapture:
         """
         try:
             region = {"left": x, "top": y, "width": width, "height": height}
-            screenshot = self.sct.grab(region)
+            screenshot = self._get_sct().grab(region)
             mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(output_path))
             return output_path
         except Exception as e:
@@ -144,11 +196,17 @@ class ScreenCapture:
     
     def get_screen_size(self) -> tuple:
         """Get primary screen dimensions."""
-        monitor = self.sct.monitors[1]
+        monitor = self._get_sct().monitors[1]
         return (monitor["width"], monitor["height"])
     
     def close(self):
         """Clean up resources."""
-        if self.sct:
-            self.sct.close()
+        with self._lock:
+            scts, self._thread_scts = self._thread_scts, []
+        for sct in scts:
+            sct.close()
+        if self._dir_fd is not None:
+            os.close(self._dir_fd)
+            self._dir_fd = None
+        if scts:
             self.logger.debug("Screen capture closed")
\ No newline at end of file
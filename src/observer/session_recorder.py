@@ -1,10 +1,11 @@
 """Main session recorder - orchestrates all capture components."""
 import time
 import signal
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List
-from threading import Lock
-from queue import Queue, Empty
+from collections import OrderedDict, deque
+from typing import Optional, List, Tuple
+from threading import Lock, Event, Thread
 
 from src.models.session_artifact import (
     SessionArtifact, TimelineEvent, InputEvent, ElementInfo, NavigationOutcome
@@ -20,6 +21,21 @@ from src.utils.logger import setup_logger
 from src.utils.config import config
 
 
+@lru_cache(maxsize=512)
+def _extract_domain(url: Optional[str]) -> Optional[str]:
+    """Extract domain from URL (cached - the same URLs recur across clicks)."""
+    if not url:
+        return None
+    try:
+        parsed = urlparse(url)
+        domain = parsed.netloc
+        if domain.startswith("www."):
+            domain = domain[4:]
+        return domain if domain else None
+    except:
+        return None
+
+
 class SessionRecorder:
     """
     Orchestrates recording of user workflow.
@@ -76,18 +92,32 @@ class SessionRecorder:
         self.start_time: Optional[float] = None
         self._last_app: Optional[str] = None
         self._last_url: Optional[str] = None
+        self._last_domain: Optional[str] = None
+        
+        # Element info memo for repeat clicks: (app, platform, x>>3, y>>3) -> (time, info)
+        self._elem_cache: "OrderedDict[tuple, Tuple[float, ElementInfo]]" = OrderedDict()
+        
+        # Last trigger for burst coalescing: (trigger, bucket, timestamp, timeline event)
+        self._last_trigger: Optional[Tuple[str, Optional[tuple], float, TimelineEvent]] = None
         
         # ============================================================
         # THREAD-SAFE EVENT QUEUE
         # ============================================================
         # InputCapture callback puts events here (from CFRunLoop thread)
         # Main thread processes them (safe to call Playwright)
-        self._event_queue: Queue = Queue()
+        # Single producer / single consumer: deque append/popleft are
+        # atomic, so only the wakeup needs a synchronization primitive.
+        self._event_queue: deque = deque()
+        self._event_ready = Event()
         
         # Pending events for current timeline event
         self._pending_events: List[InputEvent] = []
         self._events_lock = Lock()
         
+        # Backup screenshots run on their own timer thread
+        self._backup_thread: Optional[Thread] = None
+        self._backup_stop = Event()
+        
         # Signal handling
         self._original_sigint = None
     
@@ -105,7 +135,8 @@ class SessionRecorder:
         Do NOT call Playwright here. Just queue the event.
         """
         # Just put the event in the queue - main thread will process it
-        self._event_queue.put(event)
+        self._event_queue.append(event)
+        self._event_ready.set()
     
     def _process_queued_events(self):
         """
@@ -113,12 +144,12 @@ class SessionRecorder:
         
         This is safe to call Playwright from here.
         """
-        while True:
+        while self._event_queue:
             try:
-                event = self._event_queue.get_nowait()
-                self._handle_input_event(event)
-            except Empty:
+                event = self._event_queue.popleft()
+            except IndexError:
                 break
+            self._handle_input_event(event)
     
     def _handle_input_event(self, event: InputEvent):
         """
@@ -133,7 +164,24 @@ class SessionRecorder:
         trigger = self._get_trigger_type(event)
         
         if trigger:
-            self._create_timeline_event(trigger, event)
+            # Fold bursts (same trigger, same spot, within 50ms) into the
+            # timeline event already created instead of materializing another
+            bucket = (event.x >> 3, event.y >> 3) if event.x is not None and event.y is not None else None
+            last = self._last_trigger
+            if (
+                last
+                and last[0] == trigger
+                and last[1] == bucket
+                and event.timestamp - last[2] < 0.05
+            ):
+                with self._events_lock:
+                    last[3].input_events.extend(self._pending_events)
+                    self._pending_events.clear()
+                self._last_trigger = (trigger, bucket, event.timestamp, last[3])
+                return
+            
+            timeline_event = self._create_timeline_event(trigger, event)
+            self._last_trigger = (trigger, bucket, event.timestamp, timeline_event)
     
     def _get_trigger_type(self, event: InputEvent) -> Optional[str]:
         """Determine what trigger type (if any) this event represents."""
@@ -166,7 +214,7 @@ class SessionRecorder:
         
         return None
     
-    def _create_timeline_event(self, trigger: str, triggering_event: InputEvent):
+    def _create_timeline_event(self, trigger: str, triggering_event: InputEvent) -> TimelineEvent:
         """Create a timeline event from accumulated input."""
         timestamp = self._get_timestamp()
         
@@ -191,6 +239,10 @@ class SessionRecorder:
             if self._last_url and url != self._last_url:
                 trigger = "page_load"
         
+        # Element lookups from before a navigation/app switch describe another page
+        if trigger in ("page_load", "app_switch"):
+            self._elem_cache.clear()
+        
         # Take screenshot (especially important for copy events - used for extraction analysis)
         screenshot_path = None
         if self.screen_capture:
@@ -201,7 +253,8 @@ class SessionRecorder:
         if triggering_event.type == "mouse_click" and triggering_event.x and triggering_event.y:
             element_info = self._capture_element_info(
                 app_name, platform,
-                triggering_event.x, triggering_event.y
+                triggering_event.x, triggering_event.y,
+                page=url or window_title
             )
             triggering_event.element_info = element_info
         
@@ -236,6 +289,8 @@ class SessionRecorder:
         
         # Update state
         self._last_app = app_name
+        if url != self._last_url:
+            self._last_domain = _extract_domain(url)
         self._last_url = url
         
         # Log with special note for copy events
@@ -244,41 +299,58 @@ class SessionRecorder:
             self.logger.info(f"[{timestamp:.1f}s] {trigger}: Copied '{preview}...'")
         else:
             self.logger.debug(f"[{timestamp:.1f}s] {trigger}: {app_name} - {len(events)} events")
+        
+        return timeline_event
     
     def _capture_element_info(
         self, 
         app_name: str, 
         platform: str, 
         x: int, 
-        y: int
+        y: int,
+        page: Optional[str] = None
     ) -> Optional[ElementInfo]:
         """
         Capture element info at coordinates.
         
         NOTE: This must be called from the main thread only!
+        
+        Repeat clicks on the same 8px bucket of the same page (URL, or
+        window title on desktop) within a couple of seconds (double-clicks,
+        retries) reuse the previous lookup.
         """
+        now = time.time()
+        key = (app_name, platform, page, x >> 3, y >> 3)
+        cached = self._elem_cache.get(key)
+        if cached and now - cached[0] < 2.0:
+            return cached[1]
+        
+        element_info = None
         if platform == "browser" and self.browser_capture and self.browser_capture.page:
             # Convert screen coords to viewport coords
             vx, vy = self.browser_capture.screen_to_viewport_coords(x, y)
-            return self.browser_capture.get_element_at_point(vx, vy)
+            element_info = self.browser_capture.get_element_at_point(vx, vy)
         
         elif platform == "desktop" and self.desktop_capture.is_available:
-            return self.desktop_capture.capture_element_at_click(app_name, x, y)
-        
-        return None
+            element_info = self.desktop_capture.capture_element_at_click(app_name, x, y)
+        
+        if element_info is not None:
+            # Evict stale entries (oldest first) before inserting
+            while self._elem_cache:
+                oldest_key, (ts, _) = next(iter(self._elem_cache.items()))
+                if now - ts <= 5.0:
+                    break
+                del self._elem_cache[oldest_key]
+            self._elem_cache[key] = (now, element_info)
+            self._elem_cache.move_to_end(key)
+        
+        return element_info
     
     def _extract_domain(self, url: Optional[str]) -> Optional[str]:
         """Extract domain from URL."""
-        if not url:
-            return None
-        try:
-            parsed = urlparse(url)
-            domain = parsed.netloc
-            if domain.startswith("www."):
-                domain = domain[4:]
-            return domain if domain else None
-        except:
-            return None
+        if url and url == self._last_url:
+            return self._last_domain
+        return _extract_domain(url)
     
     def _capture_navigation_outcome(
         self,
@@ -301,11 +373,22 @@ class SessionRecorder:
         except:
             pass
         
-        time.sleep(0.1)  # Small additional wait
+        # Brief settle for late navigations - returns immediately once the
+        # document is complete, instead of an unconditional sleep
+        if url_before:
+            try:
+                self.browser_capture.page.wait_for_function(
+                    "document.readyState === 'complete'", timeout=100
+                )
+            except:
+                pass
         
         url_after = self.browser_capture.get_current_url()
         domain_before = self._extract_domain(url_before)
-        domain_after = self._extract_domain(url_after)
+        if url_after == url_before:
+            domain_after = domain_before
+        else:
+            domain_after = self._extract_domain(url_after)
         
         # Determine navigation type
         nav_type = "same_page"
@@ -382,6 +465,10 @@ class SessionRecorder:
         
         self.input_capture.start()
         
+        self._backup_stop.clear()
+        self._backup_thread = Thread(target=self._backup_loop, daemon=True)
+        self._backup_thread.start()
+        
         if self.voice_capture:
             if self.voice_capture.start():
                 self.logger.info("Voice recording enabled (transcription at compile time)")
@@ -407,35 +494,49 @@ class SessionRecorder:
         
         This runs in the main thread, so it's safe to call Playwright here.
         """
-        backup_interval = config.backup_screenshot_interval
-        last_backup = 0.0
+        # Block on the queue instead of spinning; app-switch polling only
+        # runs when an event arrives or at a low background rate
+        poll_interval = 0.05
+        app_check_interval = 0.5
+        last_app_check = 0.0
         
         while self.is_recording:
-            timestamp = self._get_timestamp()
-            
             # ============================================================
             # PROCESS QUEUED EVENTS (main thread - safe for Playwright)
             # ============================================================
-            self._process_queued_events()
+            if not self._event_queue:
+                self._event_ready.wait(timeout=poll_interval)
+            self._event_ready.clear()
             
-            # Check for app changes
-            current_app = self.window_manager.get_active_app()
-            if self._last_app and current_app != self._last_app:
-                self.input_capture.force_flush("app_switch")
-                self._create_timeline_event("app_switch", InputEvent(
-                    type="keyboard_shortcut",
-                    timestamp=timestamp,
-                    shortcut="app_switch"
-                ))
-            self._last_app = current_app
+            had_events = bool(self._event_queue)
+            self._process_queued_events()
             
-            # Backup screenshot at intervals
-            if timestamp - last_backup > backup_interval:
-                if self.screen_capture:
-                    self.screen_capture.capture("backup", timestamp)
-                last_backup = timestamp
+            timestamp = self._get_timestamp()
             
-            time.sleep(0.016)  # ~60 Hz loop for responsive event processing
+            # Check for app changes
+            if had_events or timestamp - last_app_check >= app_check_interval:
+                last_app_check = timestamp
+                current_app = self.window_manager.get_active_app()
+                if self._last_app and current_app != self._last_app:
+                    self.input_capture.force_flush("app_switch")
+                    self._create_timeline_event("app_switch", InputEvent(
+                        type="keyboard_shortcut",
+                        timestamp=timestamp,
+                        shortcut="app_switch"
+                    ))
+                self._last_app = current_app
+    
+    def _backup_loop(self):
+        """
+        Take backup screenshots at a fixed cadence.
+        
+        Runs on its own thread so the interval check stays out of the main
+        loop. Only touches ScreenCapture (no Playwright).
+        """
+        backup_interval = config.backup_screenshot_interval
+        while not self._backup_stop.wait(backup_interval):
+            if self.screen_capture:
+                self.screen_capture.capture("backup", self._get_timestamp())
     
     def stop(self) -> SessionArtifact:
         """Stop recording and finalize session."""
@@ -452,6 +553,10 @@ class SessionRecorder:
             signal.signal(signal.SIGINT, self._original_sigint)
         
         # Stop components
+        self._backup_stop.set()
+        if self._backup_thread:
+            self._backup_thread.join(timeout=2.0)
+        
         if self.input_capture:
             self.input_capture.stop()
         
@@ -1,12 +1,18 @@
 """Voice capture - records audio during workflow (transcription moved to compile phase)."""
 import wave
-import threading
 from pathlib import Path
 from typing import Optional
 from src.utils.logger import setup_logger
 from src.utils.config import config
 
-# Try to import pyaudio, but make it optional
+# Prefer sounddevice (CFFI, releases the GIL, hands the callback a
+# preallocated numpy buffer); fall back to pyaudio. Both are optional.
+try:
+    import sounddevice
+    SOUNDDEVICE_AVAILABLE = True
+except (ImportError, OSError):
+    SOUNDDEVICE_AVAILABLE = False
+
 try:
     import pyaudio
     PYAUDIO_AVAILABLE = True
@@ -42,25 +48,25 @@ class VoiceCapture:
         self.sample_rate = config.voice_sample_rate
         self.channels = 1
         self.chunk_size = 1024
-        self.format = None  # Set in start() if pyaudio available
+        self.format = None  # Set in start() if pyaudio is the backend
         
         # State
         self.is_recording = False
-        self.audio_frames = []
-        self._record_thread: Optional[threading.Thread] = None
+        self._frame_count = 0
+        self._wav: Optional[wave.Wave_write] = None
         self._stream = None
         self._pyaudio = None
         
         # Output path
         self.audio_path: Optional[Path] = None
         
-        if not PYAUDIO_AVAILABLE:
-            self.logger.warning("PyAudio not available. Voice capture disabled.")
+        if not (SOUNDDEVICE_AVAILABLE or PYAUDIO_AVAILABLE):
+            self.logger.warning("sounddevice/PyAudio not available. Voice capture disabled.")
     
     @property
     def is_available(self) -> bool:
         """Check if voice capture is available."""
-        return PYAUDIO_AVAILABLE and config.voice_enabled
+        return (SOUNDDEVICE_AVAILABLE or PYAUDIO_AVAILABLE) and config.voice_enabled
     
     def start(self) -> bool:
         """
@@ -74,41 +80,73 @@ class VoiceCapture:
             return False
         
         try:
-            self._pyaudio = pyaudio.PyAudio()
-            self.format = pyaudio.paInt16
-            
-            self._stream = self._pyaudio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.sample_rate,
-                input=True,
-                frames_per_buffer=self.chunk_size
-            )
-            
+            # Frames are written straight to the WAV file from the callback
+            self.audio_path = self.output_dir / "voice_recording.wav"
+            self._wav = self._open_wav(self.audio_path)
+            self._frame_count = 0
             self.is_recording = True
-            self.audio_frames = []
             
-            # Start recording thread
-            self._record_thread = threading.Thread(target=self._record_loop, daemon=True)
-            self._record_thread.start()
+            # Callback mode: PortAudio drives capture from its own native
+            # thread, so no Python thread has to block on a read()
+            if SOUNDDEVICE_AVAILABLE:
+                self._stream = sounddevice.RawInputStream(
+                    samplerate=self.sample_rate,
+                    channels=self.channels,
+                    dtype='int16',
+                    blocksize=self.chunk_size,
+                    callback=self._sd_audio_cb
+                )
+                self._stream.start()
+            else:
+                self._pyaudio = pyaudio.PyAudio()
+                self.format = pyaudio.paInt16
+                self._stream = self._pyaudio.open(
+                    format=self.format,
+                    channels=self.channels,
+                    rate=self.sample_rate,
+                    input=True,
+                    frames_per_buffer=self.chunk_size,
+                    stream_callback=self._audio_cb
+                )
+                self._stream.start_stream()
             
             self.logger.info("Voice recording started")
             return True
         
         except Exception as e:
             self.logger.error(f"Failed to start voice recording: {e}")
+            self.is_recording = False
+            if self._stream:
+                self._stream.close()
+                self._stream = None
+            if self._pyaudio:
+                self._pyaudio.terminate()
+                self._pyaudio = None
+            self._close_wav()
+            return False
+    
+    def _write_chunk(self, data, frame_count: int) -> bool:
+        """Append a chunk to the WAV file. Returns False to end the stream."""
+        if not self.is_recording or self._wav is None:
             return False
+        try:
+            self._wav.writeframes(data)
+            self._frame_count += frame_count
+            return True
+        except Exception as e:
+            self.logger.error(f"Recording error: {e}")
+            return False
+    
+    def _sd_audio_cb(self, indata, frames, time_info, status):
+        """sounddevice stream callback - indata is a raw CFFI buffer."""
+        if not self._write_chunk(indata, frames):
+            raise sounddevice.CallbackStop()
     
-    def _record_loop(self):
-        """Background recording loop."""
-        while self.is_recording:
-            try:
-                data = self._stream.read(self.chunk_size, exception_on_overflow=False)
-                self.audio_frames.append(data)
-            except Exception as e:
-                if self.is_recording:  # Only log if we didn't intentionally stop
-                    self.logger.error(f"Recording error: {e}")
-                break
+    def _audio_cb(self, in_data, frame_count, time_info, status):
+        """PortAudio stream callback - append the chunk to the WAV file."""
+        if not self._write_chunk(in_data, frame_count):
+            return (None, pyaudio.paComplete)
+        return (None, pyaudio.paContinue)
     
     def stop(self) -> Optional[Path]:
         """
@@ -122,42 +160,52 @@ class VoiceCapture:
         if not self.is_recording:
             return None
         
-        self.is_recording = False
-        
-        # Wait for recording thread
-        if self._record_thread:
-            self._record_thread.join(timeout=2.0)
-        
-        # Close stream
+        # Close stream (stopping waits for the in-flight callback to drain)
         if self._stream:
-            self._stream.stop_stream()
+            if self._pyaudio:
+                self._stream.stop_stream()
+            else:
+                self._stream.stop()
             self._stream.close()
+            self._stream = None
+        
+        self.is_recording = False
         
         if self._pyaudio:
             self._pyaudio.terminate()
+            self._pyaudio = None
         
-        # Save audio file
-        if not self.audio_frames:
-            self.logger.warning("No audio frames recorded")
-            return None
-        
-        self.audio_path = self.output_dir / "voice_recording.wav"
+        # Finalize audio file
         try:
-            self._save_wav(self.audio_path)
-            duration = len(self.audio_frames) * self.chunk_size / self.sample_rate
-            self.logger.info(f"Saved voice recording: {self.audio_path} ({duration:.1f}s)")
-            return self.audio_path
+            self._close_wav()
         except Exception as e:
             self.logger.error(f"Failed to save audio: {e}")
             return None
+        
+        if not self._frame_count:
+            self.logger.warning("No audio frames recorded")
+            if self.audio_path:
+                self.audio_path.unlink(missing_ok=True)
+            self.audio_path = None
+            return None
+        
+        duration = self._frame_count / self.sample_rate
+        self.logger.info(f"Saved voice recording: {self.audio_path} ({duration:.1f}s)")
+        return self.audio_path
+    
+    def _open_wav(self, path: Path) -> wave.Wave_write:
+        """Open a WAV file for streaming writes."""
+        wf = wave.open(str(path), 'wb')
+        wf.setnchannels(self.channels)
+        wf.setsampwidth(2)  # 16-bit audio
+        wf.setframerate(self.sample_rate)
+        return wf
     
-    def _save_wav(self, path: Path):
-        """Save recorded audio as WAV file."""
-        with wave.open(str(path), 'wb') as wf:
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(2)  # 16-bit audio
-            wf.setframerate(self.sample_rate)
-            wf.writeframes(b''.join(self.audio_frames))
+    def _close_wav(self):
+        """Close the WAV file (patches the header with the final length)."""
+        if self._wav is not None:
+            wf, self._wav = self._wav, None
+            wf.close()
     
     def get_audio_path(self) -> Optional[Path]:
         """Get path to recorded audio file."""
@@ -1,19 +1,51 @@
 """Window and application tracking for macOS."""
-from AppKit import NSWorkspace
+import re
+import time
+import weakref
+import objc
+from AppKit import (
+    NSObject,
+    NSWorkspace,
+    NSWorkspaceDidLaunchApplicationNotification,
+    NSWorkspaceDidTerminateApplicationNotification
+)
 from Quartz import (
     CGWindowListCopyWindowInfo,
     kCGWindowListOptionOnScreenOnly,
     kCGNullWindowID
 )
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, List
 from src.utils.logger import setup_logger
 
 
+class _AppListObserver(NSObject):
+    """Marks a WindowManager's running-apps cache dirty on launch/terminate."""
+    
+    def initWithManager_(self, manager):
+        self = objc.super(_AppListObserver, self).init()
+        if self is None:
+            return None
+        self._manager = weakref.ref(manager)
+        return self
+    
+    def appsChanged_(self, notification):
+        manager = self._manager()
+        if manager is not None:
+            manager._apps_dirty = True
+
+
 class WindowManager:
     """Tracks active application and window information on macOS."""
     
-    # Known browsers
-    BROWSERS = ['chrome', 'safari', 'firefox', 'edge', 'brave', 'arc', 'opera']
+    # Known browsers (matched as whole words, so "Opera" != "Operator")
+    BROWSERS = frozenset(('chrome', 'safari', 'firefox', 'edge', 'brave', 'arc', 'opera'))
+    _TOKEN_SPLIT_RE = re.compile(r'\W+')
+    
+    CACHE_TTL = 0.1  # Seconds
+    
+    # Running-apps cache is invalidated by workspace notifications; this is a
+    # backstop for when no run loop is pumping them
+    RUNNING_APPS_MAX_AGE = 5.0  # Seconds
     
     def __init__(self):
         self.workspace = NSWorkspace.sharedWorkspace()
@@ -22,9 +54,53 @@ class WindowManager:
         # Cache last known state
         self._last_app: Optional[str] = None
         self._last_window: Optional[str] = None
+        
+        # Short-lived cache so back-to-back queries share one round-trip
+        self._app_cache_ts = 0.0
+        self._app_cache_val: Optional[str] = None
+        self._snapshot_ts = 0.0
+        self._snapshot: Optional[List[Tuple[int, str, str, Optional[Dict[str, int]]]]] = None
+        
+        # Running apps, rebuilt only after a launch/terminate notification
+        self._apps_cache: List[str] = []
+        self._apps_cache_ts = 0.0
+        self._apps_dirty = True
+        self._apps_observer = None
+        try:
+            self._apps_observer = _AppListObserver.alloc().initWithManager_(self)
+            center = self.workspace.notificationCenter()
+            for name in (
+                NSWorkspaceDidLaunchApplicationNotification,
+                NSWorkspaceDidTerminateApplicationNotification,
+            ):
+                center.addObserver_selector_name_object_(
+                    self._apps_observer, "appsChanged:", name, None
+                )
+        except Exception as e:
+            self.logger.debug(f"App launch notifications unavailable: {e}")
+            self._apps_observer = None
+    
+    def __del__(self):
+        observer = getattr(self, "_apps_observer", None)
+        if observer is not None:
+            try:
+                self.workspace.notificationCenter().removeObserver_(observer)
+            except Exception:
+                pass
     
     def get_active_app(self) -> str:
         """Get the name of the currently active application."""
+        now = time.monotonic()
+        if self._app_cache_val and now - self._app_cache_ts < self.CACHE_TTL:
+            return self._app_cache_val
+        
+        app_name = self._query_active_app()
+        self._app_cache_val = app_name
+        self._app_cache_ts = now
+        return app_name
+    
+    def _query_active_app(self) -> str:
+        """Ask NSWorkspace for the active application."""
         try:
             active_app = self.workspace.activeApplication()
             if active_app:
@@ -36,25 +112,56 @@ class WindowManager:
         
         return self._last_app or "Unknown"
     
+    def _window_snapshot(self) -> Optional[List[Tuple[int, str, str, Optional[Dict[str, int]]]]]:
+        """
+        Parse the on-screen window list once per CACHE_TTL.
+        
+        Returns:
+            List of (layer, owner_lower, title, bounds) in front-to-back
+            order, or None if the window list is unavailable
+        """
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._snapshot_ts < self.CACHE_TTL:
+            return self._snapshot
+        
+        window_list = CGWindowListCopyWindowInfo(
+            kCGWindowListOptionOnScreenOnly,
+            kCGNullWindowID
+        )
+        if not window_list:
+            return None
+        
+        snapshot = []
+        for window in window_list:
+            bounds = window.get('kCGWindowBounds')
+            snapshot.append((
+                window.get('kCGWindowLayer', -1),
+                window.get('kCGWindowOwnerName', '').lower(),
+                window.get('kCGWindowName', ''),
+                {
+                    'x': int(bounds.get('X', 0)),
+                    'y': int(bounds.get('Y', 0)),
+                    'width': int(bounds.get('Width', 0)),
+                    'height': int(bounds.get('Height', 0))
+                } if bounds else None
+            ))
+        
+        self._snapshot = snapshot
+        self._snapshot_ts = now
+        return snapshot
+    
     def get_active_window_title(self) -> str:
         """Get the title of the currently active window."""
         try:
-            window_list = CGWindowListCopyWindowInfo(
-                kCGWindowListOptionOnScreenOnly,
-                kCGNullWindowID
-            )
-            
-            if not window_list:
+            snapshot = self._window_snapshot()
+            if not snapshot:
                 return self._last_window or "Unknown"
             
             # Find the frontmost window (layer 0)
-            for window in window_list:
-                layer = window.get('kCGWindowLayer', -1)
-                if layer == 0:
-                    title = window.get('kCGWindowName', '')
-                    if title:
-                        self._last_window = title
-                        return title
+            for layer, _, title, _ in snapshot:
+                if layer == 0 and title:
+                    self._last_window = title
+                    return title
             
             return self._last_window or "Unknown"
         
@@ -84,8 +191,8 @@ class WindowManager:
         if app_name is None:
             app_name = self.get_active_app()
         
-        app_lower = app_name.lower()
-        return any(browser in app_lower for browser in self.BROWSERS)
+        tokens = self._TOKEN_SPLIT_RE.split(app_name.lower())
+        return not self.BROWSERS.isdisjoint(tokens)
     
     def get_platform(self, app_name: Optional[str] = None) -> str:
         """
@@ -109,27 +216,15 @@ class WindowManager:
             Dict with x, y, width, height or None
         """
         try:
-            target_app = app_name or self.get_active_app()
+            target_app = (app_name or self.get_active_app()).lower()
             
-            window_list = CGWindowListCopyWindowInfo(
-                kCGWindowListOptionOnScreenOnly,
-                kCGNullWindowID
-            )
-            
-            if not window_list:
+            snapshot = self._window_snapshot()
+            if not snapshot:
                 return None
             
-            for window in window_list:
-                owner = window.get('kCGWindowOwnerName', '')
-                if target_app.lower() in owner.lower():
-                    bounds = window.get('kCGWindowBounds', {})
-                    if bounds:
-                        return {
-                            'x': int(bounds.get('X', 0)),
-                            'y': int(bounds.get('Y', 0)),
-                            'width': int(bounds.get('Width', 0)),
-                            'height': int(bounds.get('Height', 0))
-                        }
+            for _, owner, _, bounds in snapshot:
+                if bounds and target_app in owner:
+                    return dict(bounds)
             
             return None
         
@@ -139,8 +234,21 @@ class WindowManager:
     
     def get_running_apps(self) -> list:
         """Get list of running application names."""
+        now = time.monotonic()
+        if not self._apps_dirty and now - self._apps_cache_ts < self.RUNNING_APPS_MAX_AGE:
+            return list(self._apps_cache)
+        
         try:
             apps = self.workspace.runningApplications()
-            return [app.localizedName() for app in apps if app.localizedName()]
+            names = []
+            for app in apps:
+                name = app.localizedName()
+                if name:
+                    names.append(name)
         except Exception:
-            return []
\ No newline at end of file
+            return []
+        
+        self._apps_cache = names
+        self._apps_cache_ts = now
+        self._apps_dirty = False
+        return list(names)
\ No newline at end of file
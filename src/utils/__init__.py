@@ -3,7 +3,8 @@ from .config import config, Config
 from .logger import setup_logger
 from .safety_guard import safety_guard, SafetyGuard, SafetyCheck, DangerLevel
 from .audit_log import audit_log, AuditLog, AuditEntry, ExecutionSummary
-from .rate_limiter import rate_limiters, RateLimiter, RateLimiterManager
+from .rate_limiter import rate_limiters, RateLimiter, RateLimiterManager, TokenBucket
+from .disk_cache import DiskCache
 
 __all__ = [
     "config",
@@ -23,4 +24,7 @@ __all__ = [
     "rate_limiters",
     "RateLimiter",
     "RateLimiterManager",
+    "TokenBucket",
+    # Caching
+    "DiskCache",
 ]
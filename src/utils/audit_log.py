@@ -7,37 +7,99 @@ Provides a persistent record of all workflow executions for:
 - Compliance requirements
 """
 import json
-from datetime import datetime
+import os
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, asdict, field
+from typing import Dict, Any, Optional, List, Iterable
+from dataclasses import KW_ONLY, dataclass, field, fields, replace
 from contextlib import contextmanager
 import threading
+import queue
 
 from src.utils.logger import setup_logger
 
+# Advisory file locking for writers in other processes (POSIX only)
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
 
-@dataclass
+# orjson encodes straight to bytes in C; fall back to stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Max queued records serialized into a single write by the writer thread
+_WRITE_BATCH_SIZE = 256
+
+# Userspace buffer for the open log file; flushed when the queue drains
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def _json_default(value: Any) -> Any:
+    """Fallback encoder for the stdlib path (orjson formats datetimes itself)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode_line(data: Dict[str, Any]) -> bytes:
+    """Serialize a record as one newline-terminated JSON line."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(
+                data,
+                default=str,
+                option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            pass  # e.g. ints beyond 64 bits - let json handle it
+    return (json.dumps(data, default=_json_default) + '\n').encode('utf-8')
+
+
+def _utc_from_ns(ts_ns: int) -> datetime:
+    """Naive UTC datetime (same shape as datetime.utcnow()) from time_ns()."""
+    return datetime.fromtimestamp(ts_ns / 1e9, tz=timezone.utc).replace(tzinfo=None)
+
+
+@dataclass(slots=True)
 class AuditEntry:
-    """A single audit log entry."""
-    timestamp: str
+    """
+    A single audit log entry.
+    
+    ts_ns is captured at construction; the ISO timestamp is formatted from
+    it when the entry is logged, unless the caller supplies one explicitly.
+    Only timestamp may be passed positionally; every other field is
+    keyword-only.
+    """
+    timestamp: Optional[str] = None
+    _: KW_ONLY
     workflow_id: str
     step_id: str
     step_number: int
     action_type: str
+    ts_ns: int = field(default_factory=time.time_ns)
     goal_type: Optional[str] = None
     platform: Optional[str] = None
     app_name: Optional[str] = None
-    parameters: Dict[str, Any] = field(default_factory=dict)
+    parameters: Optional[Dict[str, Any]] = None  # None = no parameters
     result: str = "pending"  # pending, success, failed, blocked, skipped
     strategy_used: Optional[str] = None
     duration_ms: int = 0
     error: Optional[str] = None
-    extracted_data: Dict[str, Any] = field(default_factory=dict)
+    extracted_data: Optional[Dict[str, Any]] = None  # None = nothing extracted
     safety_check: Optional[str] = None  # Result of safety check if applicable
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow field dict (no recursive copy, unlike dataclasses.asdict)."""
+        return {name: getattr(self, name) for name in _ENTRY_FIELDS}
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionSummary:
     """Summary of a workflow execution."""
     workflow_id: str
@@ -53,6 +115,22 @@ class ExecutionSummary:
     parameters_used: Dict[str, Any] = field(default_factory=dict)
     extracted_data: Dict[str, Any] = field(default_factory=dict)
     final_status: str = "running"  # running, completed, failed, aborted
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow field dict (no recursive copy, unlike dataclasses.asdict)."""
+        return {name: getattr(self, name) for name in _SUMMARY_FIELDS}
+
+
+_ENTRY_FIELDS = tuple(f.name for f in fields(AuditEntry) if f.name != 'ts_ns')
+_SUMMARY_FIELDS = tuple(f.name for f in fields(ExecutionSummary))
+
+# Summary fields written in the execution_end footer. Per-step
+# extracted_data is already in each step line; readers aggregate via load_log.
+SUMMARY_FOOTER_FIELDS = (
+    'workflow_id', 'workflow_name', 'start_time', 'end_time',
+    'total_steps', 'successful_steps', 'failed_steps', 'blocked_steps',
+    'skipped_steps', 'total_duration_ms', 'final_status'
+)
 
 
 class AuditLog:
@@ -61,12 +139,15 @@ class AuditLog:
     
     Creates JSONL (JSON Lines) files for easy parsing and streaming.
     
+    Records are queued and written by a single background thread that
+    drains them in batches into a file kept open for the whole execution,
+    so callers never block on disk I/O.
+    
     Usage:
         audit = AuditLog()
         audit.start_execution("my_workflow", "My Workflow", {"param": "value"})
         
         audit.log_step(AuditEntry(
-            timestamp=datetime.utcnow().isoformat(),
             workflow_id="my_workflow",
             step_id="step_1",
             step_number=1,
@@ -77,13 +158,16 @@ class AuditLog:
         audit.end_execution(success=True)
     """
     
-    def __init__(self, log_dir: Optional[Path] = None):
+    def __init__(self, log_dir: Optional[Path] = None, sync_interval: Optional[float] = None):
         """
         Initialize audit logger.
         
         Args:
             log_dir: Directory to store audit logs. 
                     Defaults to artifacts/audit_logs/
+            sync_interval: If set, also fsync mid-execution at most every
+                    this many seconds. Logs are always fsynced once at
+                    end_execution.
         """
         self.logger = setup_logger("AuditLog")
         self.log_dir = log_dir or Path("artifacts/audit_logs")
@@ -91,8 +175,28 @@ class AuditLog:
         
         self._current_log_path: Optional[Path] = None
         self._current_summary: Optional[ExecutionSummary] = None
-        self._entries: List[AuditEntry] = []
-        self._lock = threading.Lock()
+        self._lock = threading.Lock()  # Serializes start/end only
+        
+        # Background writer. SimpleQueue put/get need no Python-level lock,
+        # so log_step is a single put; the writer owns the summary counters.
+        # Producers serialize their own records, so JSON encoding runs in
+        # parallel across threads and the writer only concatenates bytes.
+        #   ("open", (path, summary)) / ("step", (result, duration_ms, bytes))
+        #   ("steps", [(result, duration_ms, bytes)]) / ("line", bytes)
+        #   ("end", (footer, Event))
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._fh = None
+        self._summary: Optional[ExecutionSummary] = None  # Writer's view
+        self._sync_interval = sync_interval
+        self._last_sync = 0.0
+        
+        # get_recent_logs listing, valid while the directory mtime is unchanged
+        self._recent_cache_dir_mtime = -1
+        self._recent_cache: List[Path] = []
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name="AuditLogWriter", daemon=True
+        )
+        self._writer_thread.start()
         
         self.logger.info(f"AuditLog initialized: {self.log_dir}")
     
@@ -116,29 +220,30 @@ class AuditLog:
         with self._lock:
             timestamp = datetime.utcnow()
             filename = f"{workflow_id}_{timestamp.strftime('%Y%m%d_%H%M%S')}.jsonl"
-            self._current_log_path = self.log_dir / filename
+            log_path = self.log_dir / filename
             
-            self._current_summary = ExecutionSummary(
+            summary = ExecutionSummary(
                 workflow_id=workflow_id,
                 workflow_name=workflow_name,
                 start_time=timestamp.isoformat(),
                 parameters_used=parameters or {}
             )
-            
-            self._entries = []
+            self._queue.put(("open", (log_path, summary)))
             
             # Write header entry
-            header = {
+            self._queue.put(("line", _encode_line({
                 "type": "execution_start",
                 "workflow_id": workflow_id,
                 "workflow_name": workflow_name,
                 "start_time": timestamp.isoformat(),
                 "parameters": parameters or {}
-            }
-            self._write_line(header)
+            })))
+            
+            self._current_summary = summary
+            self._current_log_path = log_path
             
-            self.logger.info(f"Started audit log: {self._current_log_path}")
-            return self._current_log_path
+            self.logger.info(f"Started audit log: {log_path}")
+            return log_path
     
     def log_step(self, entry: AuditEntry):
         """
@@ -147,36 +252,36 @@ class AuditLog:
         Args:
             entry: AuditEntry with step details
         """
-        with self._lock:
-            if not self._current_log_path:
-                self.logger.warning("No active execution - call start_execution first")
-                return
-            
-            self._entries.append(entry)
-            
-            # Update summary counts
-            if self._current_summary:
-                self._current_summary.total_steps += 1
-                if entry.result == "success":
-                    self._current_summary.successful_steps += 1
-                elif entry.result == "failed":
-                    self._current_summary.failed_steps += 1
-                elif entry.result == "blocked":
-                    self._current_summary.blocked_steps += 1
-                elif entry.result == "skipped":
-                    self._current_summary.skipped_steps += 1
-                
-                self._current_summary.total_duration_ms += entry.duration_ms
-                
-                if entry.extracted_data:
-                    self._current_summary.extracted_data.update(entry.extracted_data)
-            
-            # Write to file
-            log_entry = {
-                "type": "step",
-                **asdict(entry)
-            }
-            self._write_line(log_entry)
+        if not self._current_log_path:
+            self.logger.warning("No active execution - call start_execution first")
+            return
+        
+        try:
+            record = self._encode_step(entry)
+        except Exception as e:
+            self.logger.error(f"Failed to serialize audit entry: {e}")
+            return
+        self._queue.put(("step", record))
+    
+    def log_steps(self, entries: Iterable[AuditEntry]):
+        """
+        Log several step executions with a single queue operation.
+        
+        Args:
+            entries: AuditEntry objects, in execution order
+        """
+        if not self._current_log_path:
+            self.logger.warning("No active execution - call start_execution first")
+            return
+        
+        batch = []
+        for entry in entries:
+            try:
+                batch.append(self._encode_step(entry))
+            except Exception as e:
+                self.logger.error(f"Failed to serialize audit entry: {e}")
+        if batch:
+            self._queue.put(("steps", batch))
     
     def log_safety_block(
         self,
@@ -196,9 +301,9 @@ class AuditLog:
             reason: Why it was blocked
             blocked_content: The content that triggered the block
         """
+        summary = self._current_summary
         entry = AuditEntry(
-            timestamp=datetime.utcnow().isoformat(),
-            workflow_id=self._current_summary.workflow_id if self._current_summary else "unknown",
+            workflow_id=summary.workflow_id if summary else "unknown",
             step_id=step_id,
             step_number=step_number,
             action_type=action_type,
@@ -223,50 +328,196 @@ class AuditLog:
             extracted_data: Final extracted data from the workflow
         """
         with self._lock:
-            if not self._current_log_path or not self._current_summary:
+            summary = self._current_summary
+            if not self._current_log_path or not summary:
                 self.logger.warning("No active execution to end")
                 return
             
-            end_time = datetime.utcnow()
-            self._current_summary.end_time = end_time.isoformat()
-            self._current_summary.final_status = "completed" if success else "failed"
-            
-            if extracted_data:
-                self._current_summary.extracted_data.update(extracted_data)
-            
-            # Write footer entry
+            # The writer applies this after every step queued before it
+            closed = threading.Event()
             footer = {
-                "type": "execution_end",
-                **asdict(self._current_summary),
-                "error": error
+                "end_time": datetime.utcnow().isoformat(),
+                "final_status": "completed" if success else "failed",
+                "extracted_data": extracted_data,
+                "error": error,
             }
-            self._write_line(footer)
-            
-            self.logger.info(
-                f"Ended audit log: {self._current_summary.final_status} "
-                f"({self._current_summary.successful_steps}/{self._current_summary.total_steps} steps)"
-            )
+            self._queue.put(("end", (footer, closed)))
             
             # Reset state
             self._current_log_path = None
             self._current_summary = None
-            self._entries = []
-    
-    def _write_line(self, data: Dict[str, Any]):
-        """Write a JSON line to the log file."""
-        if not self._current_log_path:
+        
+        # Wait for the writer so the file is complete when we return
+        if not closed.wait(timeout=5.0):
+            self.logger.warning("Timed out waiting for audit log writer to flush")
             return
         
+        self.logger.info(
+            f"Ended audit log: {summary.final_status} "
+            f"({summary.successful_steps}/{summary.total_steps} steps)"
+        )
+    
+    @staticmethod
+    def _encode_step(entry: AuditEntry) -> tuple:
+        """Serialize a step on the calling thread: (result, duration_ms, line)."""
+        data = {
+            "type": "step",
+            **entry.to_dict()
+        }
+        if data["timestamp"] is None:
+            data["timestamp"] = _utc_from_ns(entry.ts_ns)
+        # Unset dicts are written as {} to keep the line shape stable
+        if data["parameters"] is None:
+            data["parameters"] = {}
+        if data["extracted_data"] is None:
+            data["extracted_data"] = {}
+        return (entry.result, entry.duration_ms, _encode_line(data))
+    
+    def _apply_step(self, result: str, duration_ms: int):
+        """Update summary counts for a step (writer thread only)."""
+        summary = self._summary
+        if summary:
+            summary.total_steps += 1
+            if result == "success":
+                summary.successful_steps += 1
+            elif result == "failed":
+                summary.failed_steps += 1
+            elif result == "blocked":
+                summary.blocked_steps += 1
+            elif result == "skipped":
+                summary.skipped_steps += 1
+            
+            summary.total_duration_ms += duration_ms
+    
+    def _apply_end(self, footer: Dict[str, Any]) -> Dict[str, Any]:
+        """Finalize the summary and build the footer (writer thread only)."""
+        summary = self._summary
+        summary.end_time = footer["end_time"]
+        summary.final_status = footer["final_status"]
+        
+        data = {"type": "execution_end"}
+        for name in SUMMARY_FOOTER_FIELDS:
+            data[name] = getattr(summary, name)
+        if footer["extracted_data"]:
+            # Final data handed to end_execution (not the per-step history)
+            summary.extracted_data.update(footer["extracted_data"])
+            data["extracted_data"] = footer["extracted_data"]
+        data["error"] = footer["error"]
+        return data
+    
+    def _writer_loop(self):
+        """Drain pre-encoded records in batches, one write() per batch."""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            lines: List[bytes] = []
+            for kind, payload in batch:
+                if kind == "line":
+                    lines.append(payload)
+                    continue
+                
+                if kind == "step":
+                    result, duration_ms, line = payload
+                    self._apply_step(result, duration_ms)
+                    lines.append(line)
+                    continue
+                
+                if kind == "steps":
+                    for result, duration_ms, line in payload:
+                        self._apply_step(result, duration_ms)
+                        lines.append(line)
+                    continue
+                
+                if kind == "end":
+                    footer, closed = payload
+                    try:
+                        if self._summary:
+                            lines.append(_encode_line(self._apply_end(footer)))
+                    except Exception as e:
+                        self.logger.error(f"Failed to serialize audit footer: {e}")
+                
+                # Open/end: flush what we have for the current file first
+                self._flush_lines(lines)
+                lines = []
+                self._close_file(sync=(kind == "end"))
+                self._summary = None
+                if kind == "open":
+                    log_path, self._summary = payload
+                    try:
+                        self._fh = open(log_path, 'ab', buffering=_WRITE_BUFFER_SIZE)
+                        self._last_sync = time.monotonic()
+                    except Exception as e:
+                        self.logger.error(f"Failed to open audit log: {e}")
+                elif kind == "end":
+                    closed.set()
+            
+            self._flush_lines(lines, flush=self._queue.empty())
+            
+            if (
+                self._sync_interval is not None
+                and self._fh is not None
+                and time.monotonic() - self._last_sync >= self._sync_interval
+            ):
+                self._sync_file()
+    
+    def _flush_lines(self, lines: List[bytes], flush: bool = True):
+        """
+        Write a batch of serialized lines to the open file.
+        
+        Every syscall the batch causes (including buffer spills) happens
+        under an exclusive flock, so lines from other processes appending
+        to the same file cannot interleave, even past PIPE_BUF.
+        """
+        if self._fh is None or not (lines or flush):
+            return
+        locked = False
         try:
-            with open(self._current_log_path, 'a') as f:
-                f.write(json.dumps(data, default=str) + '\n')
+            if FCNTL_AVAILABLE:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+                locked = True
+            if lines:
+                self._fh.write(b"".join(lines))
+            if flush:
+                self._fh.flush()
         except Exception as e:
             self.logger.error(f"Failed to write audit log: {e}")
+        finally:
+            if locked:
+                try:
+                    fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+                except Exception:
+                    pass
+    
+    def _sync_file(self):
+        """Flush and fsync the open log file."""
+        try:
+            self._flush_lines([])
+            os.fsync(self._fh.fileno())
+        except Exception as e:
+            self.logger.error(f"Failed to sync audit log: {e}")
+        self._last_sync = time.monotonic()
+    
+    def _close_file(self, sync: bool = False):
+        """Close the current log file, if any (fsync first if requested)."""
+        if self._fh is None:
+            return
+        if sync:
+            self._sync_file()
+        try:
+            self._fh.close()
+        except Exception as e:
+            self.logger.error(f"Failed to close audit log: {e}")
+        self._fh = None
     
     def get_current_summary(self) -> Optional[ExecutionSummary]:
-        """Get the current execution summary."""
-        with self._lock:
-            return self._current_summary
+        """Get a snapshot of the current execution summary."""
+        summary = self._current_summary
+        return replace(summary) if summary else None
     
     def get_recent_logs(self, limit: int = 10) -> List[Path]:
         """
@@ -278,12 +529,17 @@ class AuditLog:
         Returns:
             List of paths sorted by modification time (newest first)
         """
-        logs = sorted(
-            self.log_dir.glob("*.jsonl"),
-            key=lambda p: p.stat().st_mtime,
-            reverse=True
-        )
-        return logs[:limit]
+        # Creating or removing a log bumps the directory mtime, so one stat
+        # tells us whether the cached listing is still current
+        dir_mtime = self.log_dir.stat().st_mtime_ns
+        if dir_mtime != self._recent_cache_dir_mtime:
+            self._recent_cache = sorted(
+                self.log_dir.glob("*.jsonl"),
+                key=lambda p: p.stat().st_mtime,
+                reverse=True
+            )
+            self._recent_cache_dir_mtime = dir_mtime
+        return self._recent_cache[:limit]
     
     @staticmethod
     def load_log(log_path: Path) -> List[Dict[str, Any]]:
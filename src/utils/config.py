@@ -2,25 +2,45 @@
 import os
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import cached_property
+from types import MappingProxyType
+from typing import Optional, Mapping
 
+# Working directory at import time - the default artifacts root
+_CWD = Path.cwd()
 
-@dataclass
+
+@dataclass(frozen=True)
 class Config:
-    """Central configuration for PbD system."""
+    """
+    Central configuration for PbD system.
+    
+    Immutable once built; use Config.from_env() to apply overrides.
+    """
     
     # =========================================================================
     # PATHS
     # =========================================================================
-    artifacts_dir: Path = field(default_factory=lambda: Path.cwd() / "artifacts")
+    artifacts_dir: Path = field(default_factory=lambda: _CWD / "artifacts")
     
-    @property
+    # Directories are created on first access rather than on construction
+    @cached_property
     def sessions_dir(self) -> Path:
-        return self.artifacts_dir / "sessions"
+        path = self.artifacts_dir / "sessions"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
     
-    @property
+    @cached_property
     def recipes_dir(self) -> Path:
-        return self.artifacts_dir / "recipes"
+        path = self.artifacts_dir / "recipes"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    
+    @cached_property
+    def cache_dir(self) -> Path:
+        path = self.artifacts_dir / "cache"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
     
     # =========================================================================
     # INPUT CAPTURE SETTINGS
@@ -56,6 +76,12 @@ class Config:
     llm_model: str = "gpt-4o"
     llm_temperature: float = 0.0
     llm_max_tokens: int = 2000
+    llm_max_attempts: int = 5  # Tries per OpenAI request on rate limits / transient errors
+    llm_warmup: bool = True  # Pre-open the API connection when the client is created
+    semantic_cache_enabled: bool = False  # Reuse responses for near-identical prompts (needs numpy)
+    semantic_cache_threshold: float = 0.95  # Minimum cosine similarity for a semantic hit
+    llm_disk_cache: bool = True  # Persist deterministic completions across runs
+    llm_disk_cache_ttl: Optional[float] = 24 * 3600.0  # Seconds; None keeps entries until evicted by size
     
     # UPDATED: Use gpt-4o-transcribe instead of whisper-1
     whisper_model: str = "gpt-4o-transcribe"
@@ -68,6 +94,11 @@ class Config:
     gemini_use_for_extraction: bool = True
     gemini_use_as_fallback: bool = True
     gemini_use_for_validation: bool = False
+    gemini_concurrency: int = 4  # Max in-flight async Gemini requests
+    gemini_tpm_limit: int = 1_000_000  # Tokens per minute quota for the vision model
+    gemini_timeout_ms: int = 60_000  # Per-request HTTP timeout
+    gemini_cache_enabled: bool = True  # Reuse responses for identical vision requests
+    gemini_cache_ttl: float = 7 * 24 * 3600.0  # Seconds before a cached response expires
     
     # =========================================================================
     # SEGMENTATION SETTINGS
@@ -97,43 +128,53 @@ class Config:
     log_file: Optional[Path] = None
     structured_logs: bool = False
     
-    def __post_init__(self):
-        """Create directories if they don't exist."""
-        self.sessions_dir.mkdir(parents=True, exist_ok=True)
-        self.recipes_dir.mkdir(parents=True, exist_ok=True)
-    
     @classmethod
     def from_env(cls) -> "Config":
         """Create config from environment variables."""
-        config = cls()
+        overrides = {}
         
-        # Override from environment
-        if os.getenv("PBD_SESSIONS_DIR"):
-            config.artifacts_dir = Path(os.getenv("PBD_SESSIONS_DIR")).parent
+        # Override from environment (each variable read once)
+        sessions_dir = os.getenv("PBD_SESSIONS_DIR")
+        if sessions_dir:
+            overrides["artifacts_dir"] = Path(sessions_dir).parent
         
-        if os.getenv("PBD_LOG_LEVEL"):
-            config.log_level = os.getenv("PBD_LOG_LEVEL")
+        log_level = os.getenv("PBD_LOG_LEVEL")
+        if log_level:
+            overrides["log_level"] = log_level
         
-        if os.getenv("PBD_LLM_MODEL"):
-            config.llm_model = os.getenv("PBD_LLM_MODEL")
+        llm_model = os.getenv("PBD_LLM_MODEL")
+        if llm_model:
+            overrides["llm_model"] = llm_model
         
-        if os.getenv("PBD_GEMINI_MODEL"):
-            config.gemini_model = os.getenv("PBD_GEMINI_MODEL")
+        gemini_model = os.getenv("PBD_GEMINI_MODEL")
+        if gemini_model:
+            overrides["gemini_model"] = gemini_model
         
-        if os.getenv("PBD_BROWSER_HEADLESS"):
-            config.browser_headless = os.getenv("PBD_BROWSER_HEADLESS").lower() == "true"
+        gemini_concurrency = os.getenv("PBD_GEMINI_CONCURRENCY")
+        if gemini_concurrency:
+            overrides["gemini_concurrency"] = int(gemini_concurrency)
         
-        if os.getenv("PBD_WHISPER_MODEL"):
-            config.whisper_model = os.getenv("PBD_WHISPER_MODEL")
+        browser_headless = os.getenv("PBD_BROWSER_HEADLESS")
+        if browser_headless:
+            overrides["browser_headless"] = browser_headless.lower() == "true"
         
-        return config
+        whisper_model = os.getenv("PBD_WHISPER_MODEL")
+        if whisper_model:
+            overrides["whisper_model"] = whisper_model
+        
+        return cls(**overrides)
     
-    def check_api_keys(self) -> dict:
-        """Check which API keys are configured."""
-        return {
+    @cached_property
+    def api_keys(self) -> Mapping[str, bool]:
+        """Which API keys are configured (read-only, computed once)."""
+        return MappingProxyType({
             "openai": bool(self.openai_api_key),
             "google": bool(self.google_api_key),
-        }
+        })
+    
+    def check_api_keys(self) -> Mapping[str, bool]:
+        """Check which API keys are configured."""
+        return self.api_keys
     
     def print_status(self):
         """Print configuration status."""
@@ -0,0 +1,133 @@
+"""
+Persistent on-disk cache for API responses.
+
+A thin SQLite key/value store with per-entry TTL and a soft size limit.
+Values are stored as JSON, so only plain decoded data (dicts, lists,
+strings) should be cached - never SDK response objects.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from src.utils.logger import setup_logger
+
+
+# Prune expired/oversized entries once every N writes
+_PRUNE_EVERY = 100
+
+
+class DiskCache:
+    """
+    SQLite-backed cache with TTL expiry.
+
+    Safe to share between threads; each get/set is a single statement.
+    Failures are logged and treated as misses so the cache can never
+    break the calling code path.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: Optional[float] = None,
+        size_limit: int = 2 * 1024 ** 3
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.size_limit = size_limit
+        self.logger = setup_logger("DiskCache")
+
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created REAL NOT NULL, expires REAL)"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on miss/expiry."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning("Cache read failed: %s", e)
+            return None
+
+        if row is None:
+            return None
+
+        value, expires = row
+        if expires is not None and expires < time.time():
+            return None
+
+        try:
+            return json.loads(value)
+        except ValueError as e:
+            self.logger.warning("Cache entry unreadable, treating as miss: %s", e)
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serializable value."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires = now + ttl if ttl else None
+
+        try:
+            payload = json.dumps(value)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created, expires) VALUES (?, ?, ?, ?)",
+                    (key, payload, now, expires)
+                )
+                self._writes += 1
+                if self._writes % _PRUNE_EVERY == 0:
+                    self._prune(now)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self.logger.warning("Cache write failed: %s", e)
+
+    def delete(self, key: str):
+        """Remove an entry, if present."""
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self.logger.warning("Cache delete failed: %s", e)
+    
+    def _prune(self, now: float):
+        """Drop expired entries, then the oldest ones while over size_limit."""
+        self._conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?", (now,))
+
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache"
+        ).fetchone()
+        if total <= self.size_limit:
+            return
+
+        excess = total - self.size_limit
+        rows = self._conn.execute("SELECT key, LENGTH(value) FROM cache ORDER BY created")
+        doomed = []
+        for key, size in rows:
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", doomed)
+        self.logger.debug("Evicted %d cache entries over size limit", len(doomed))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,11 +1,25 @@
 """Gemini client wrapper - dual model approach."""
+import asyncio
 import json
 import base64
+import hashlib
+import threading
+import weakref
+import io
+import mmap
+import random
+import re
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Iterator, Union, Literal
+from pydantic import BaseModel
 from src.utils.logger import setup_logger
 from src.utils.config import config
-from src.utils.rate_limiter import rate_limiters
+from src.utils.rate_limiter import rate_limiters, TokenBucket
+from src.utils.disk_cache import DiskCache
 
 try:
     from google import genai
@@ -16,6 +30,165 @@ except ImportError:
     genai = None
     types = None
 
+# httpx only negotiates HTTP/2 when the h2 package is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Status codes worth retrying; 429 additionally tightens the throttle
+_RETRYABLE_CODES = frozenset({429, 500, 502, 503, 504})
+# Server-suggested wait in a RESOURCE_EXHAUSTED error, e.g. "retryDelay": "17s"
+_RETRY_DELAY_RE = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+# orjson parses several times faster than the stdlib; both raise JSONDecodeError
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    from PIL import Image, features as pil_features
+    PIL_AVAILABLE = True
+    # Prefer WebP when Pillow was built with it; JPEG otherwise
+    UPLOAD_FORMAT, UPLOAD_MIME = ("WEBP", "image/webp") if pil_features.check("webp") else ("JPEG", "image/jpeg")
+except ImportError:
+    PIL_AVAILABLE = False
+    Image = None
+    UPLOAD_FORMAT, UPLOAD_MIME = None, None
+
+
+# Whitespace and separators between members of a streamed JSON object
+_MEMBER_GAP_RE = re.compile(r'[\s,]*')
+_WHITESPACE_RE = re.compile(r'\s*')
+_NUMBER_END = frozenset(" \t\r\n,}")
+
+
+class _StreamingObjectParser:
+    """
+    Incremental parser for one top-level JSON object arriving in chunks.
+    
+    Each feed() returns the (key, value) members that became complete.
+    JSON objects only grow by appending members, so emitted pairs are
+    final. Leading text such as a markdown fence is skipped.
+    """
+    
+    _decoder = json.JSONDecoder()
+    
+    def __init__(self):
+        self._buf = ""
+        self._pos: Optional[int] = None  # Just past the last consumed member
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._buf += chunk
+        buf = self._buf
+        
+        if self._pos is None:
+            start = buf.find("{")
+            if start < 0:
+                return []
+            self._pos = start + 1
+        
+        pairs = []
+        pos = self._pos
+        while True:
+            pos = _MEMBER_GAP_RE.match(buf, pos).end()
+            if pos >= len(buf) or buf[pos] == "}":
+                break
+            try:
+                key, colon = self._decoder.raw_decode(buf, pos)
+                colon = _WHITESPACE_RE.match(buf, colon).end()
+                if colon >= len(buf) or buf[colon] != ":":
+                    break
+                start = _WHITESPACE_RE.match(buf, colon + 1).end()
+                value, end = self._decoder.raw_decode(buf, start)
+            except json.JSONDecodeError:
+                break
+            # A number is only final once a delimiter follows it ("4" may become "4.5")
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if end >= len(buf) or buf[end] not in _NUMBER_END:
+                    break
+            if isinstance(key, str):
+                pairs.append((key, value))
+            pos = end
+        
+        self._pos = pos
+        return pairs
+
+
+# =========================================================================
+# RESPONSE SCHEMAS (typed decode for JSON-mode calls)
+# =========================================================================
+
+class PageClassification(BaseModel):
+    page_type: Literal[
+        "detail_page", "list_page", "search_results", "home_page",
+        "login_page", "form_page", "error_page", "other",
+    ]
+    is_detail_page: bool
+    is_list_page: bool
+    confidence: float
+    description: str
+
+
+class FindElementResult(BaseModel):
+    found: bool
+    x: int = 0
+    y: int = 0
+    confidence: float = 0.0
+    description: str = ""
+    reason: str = ""
+
+
+class _AdaptiveGate:
+    """
+    Async concurrency gate whose ceiling adapts to quota pressure.
+    
+    The ceiling halves on every 429 and grows back by one after a
+    ceiling's worth of consecutive successes (AIMD).
+    """
+    
+    def __init__(self, limit: int):
+        self.max_limit = max(1, limit)
+        self.limit = self.max_limit
+        self._active = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+    
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+    
+    def throttle(self):
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
+    
+    def succeed(self):
+        if self.limit >= self.max_limit:
+            return
+        self._successes += 1
+        if self._successes >= self.limit:
+            self.limit += 1
+            self._successes = 0
+
+
+class _InflightAbandoned(Exception):
+    """The task that owned a shared in-flight request was cancelled."""
+
+
+@lru_cache(maxsize=128)
+def _text_part(text: str):
+    """Shared Part for prompts that repeat (same schema, same expected type)."""
+    return types.Part.from_text(text=text)
+
 
 class GeminiClient:
     """
@@ -25,7 +198,8 @@ class GeminiClient:
     - Vision model (gemini-2.0-flash): For extraction and analysis tasks
     - Computer Use model: For agentic UI control fallback
     
-    Features rate limiting to prevent API quota exhaustion.
+    Features rate limiting to prevent API quota exhaustion. Vision methods
+    have *_async variants that overlap requests up to gemini_concurrency.
     """
     
     # Model for vision/extraction tasks (compile-time analysis)
@@ -34,6 +208,82 @@ class GeminiClient:
     # Model for agentic computer use (replay-time fallback)
     COMPUTER_USE_MODEL = "gemini-2.5-computer-use-preview-10-2025"
     
+    # Recent analyze_page results kept for classify/validate/extract reuse
+    PAGE_ANALYSIS_CACHE_SIZE = 16
+    _CLASSIFY_KEYS = ("page_type", "is_detail_page", "is_list_page", "confidence", "description")
+    
+    # Near-identical screenshots (Hamming distance on a 64-bit dHash) reuse
+    # a recent classification instead of calling the model again. A dHash
+    # cannot tell same-layout pages apart, so this only answers
+    # classify_page_type, and only for PHASH_TTL seconds (polling one page).
+    PHASH_CACHE_SIZE = 256
+    PHASH_MAX_DISTANCE = 6
+    PHASH_TTL = 30.0
+    
+    # Multi-image batches: a downscaled 1024px screenshot is ~4 tiles of 258 tokens
+    BATCH_MAX_IMAGES = 16
+    IMAGE_TOKEN_ESTIMATE = 4 * 258
+    
+    # Throttling: TPM reservations are padded, failed calls back off exponentially
+    TOKEN_SAFETY_MULTIPLIER = 1.2
+    MAX_ATTEMPTS = 5
+    BACKOFF_INITIAL = 1.0
+    BACKOFF_MAX = 32.0
+    COMPUTER_USE_CONCURRENCY = 2
+    
+    # Computer Use loops move their history into a server-side cache once it
+    # has this many turns, and roll the cache forward as new turns pile up
+    PREFIX_CACHE_MIN_CONTENTS = 3
+    PREFIX_CACHE_REBUILD_CONTENTS = 4
+    PREFIX_CACHE_TTL_SECONDS = 300
+    
+    # Feedback screenshots are sent as small JPEGs, and only the newest few
+    # stay in the history - older ones are replaced with a text stub
+    FEEDBACK_IMAGE_MAX_DIM = 1280
+    FEEDBACK_IMAGE_QUALITY = 75
+    FEEDBACK_SCREENSHOTS_KEPT = 3
+    
+    # Request configs are immutable - build them once instead of per call
+    if GEMINI_AVAILABLE:
+        # All vision calls use JSON mode, so responses never carry markdown fences.
+        # Output budgets are sized to the expected answer: they count against TPM.
+        _ANALYZE_EXTRACTION_CONFIG = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            temperature=0.1,
+            max_output_tokens=1500,
+        )
+        _EXTRACT_PAGE_DATA_CONFIG = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            temperature=0.0,
+            max_output_tokens=1000,
+        )
+        _ANALYZE_PAGE_CONFIG = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            temperature=0.0,
+            max_output_tokens=1200,
+        )
+        _FIND_ELEMENT_CONFIG = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=FindElementResult,
+            temperature=0.0,
+            max_output_tokens=128,
+        )
+        _CLASSIFY_BATCH_CONFIG = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=list[PageClassification],
+            temperature=0.0,
+        )
+        # Computer Use tool (REQUIRED for the Computer Use model)
+        _COMPUTER_USE_CONFIG = types.GenerateContentConfig(
+            tools=[
+                types.Tool(
+                    computer_use=types.ComputerUse(
+                        environment=types.Environment.ENVIRONMENT_BROWSER
+                    )
+                )
+            ],
+        )
+    
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or config.google_api_key
         self.logger = setup_logger("GeminiClient")
@@ -41,6 +291,34 @@ class GeminiClient:
         # Rate limiter for Gemini API calls
         self._rate_limiter = rate_limiters.get("gemini")
         
+        # Token budget shared by all calls, and a cooldown set by 429 responses
+        self._tpm_bucket = TokenBucket(config.gemini_tpm_limit, per_seconds=60.0, name="gemini-tpm")
+        self._retry_after = 0.0  # time.monotonic() deadline
+        
+        # Async calls get one adaptive gate per model per event loop
+        self._concurrency = {
+            self.VISION_MODEL: config.gemini_concurrency,
+            self.COMPUTER_USE_MODEL: self.COMPUTER_USE_CONCURRENCY,
+        }
+        self._gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _AdaptiveGate]]" = weakref.WeakKeyDictionary()
+        
+        # SDK clients for async calls, one per event loop (see _aio_models)
+        self._aio_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        
+        # Response cache, opened on first vision call
+        self._cache: Optional[DiskCache] = None
+        
+        # Async requests currently on the wire, per event loop, keyed like the
+        # cache - a future can only be awaited on the loop that created it
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = weakref.WeakKeyDictionary()
+        
+        # Screenshot digest -> (expected_type, analyze_page result)
+        self._page_analyses: "OrderedDict[str, Tuple[Optional[str], Dict[str, Any]]]" = OrderedDict()
+        self._page_analyses_lock = threading.Lock()
+        
+        # Perceptual hash -> (expected_type, classification), shares the lock above
+        self._phash_cache: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        
         if not GEMINI_AVAILABLE:
             self.logger.warning(
                 "google-genai not installed. Install with: pip install google-genai\n"
@@ -52,7 +330,7 @@ class GeminiClient:
             self.client = None
         else:
             try:
-                self.client = genai.Client(api_key=self.api_key)
+                self.client = self._create_client()
                 self.logger.info(f"Gemini client initialized")
                 self.logger.info(f"  Vision model: {self.VISION_MODEL}")
                 self.logger.info(f"  Computer Use model: {self.COMPUTER_USE_MODEL}")
@@ -60,6 +338,38 @@ class GeminiClient:
                 self.logger.error(f"Failed to initialize Gemini client: {e}")
                 self.client = None
     
+    def _create_client(self, for_async: bool = False):
+        """
+        Build the SDK client on a pooled, keep-alive transport.
+        
+        Concurrent replay calls then reuse warm connections (multiplexed
+        over HTTP/2 when available) instead of paying a handshake each.
+        Only the sync transport is pooled here; an async pool belongs to one
+        event loop, so for_async clients are built per loop (_aio_models).
+        Older SDKs without client_args get a plain client.
+        """
+        import httpx  # Always present alongside google-genai
+        
+        transport_args = {
+            "http2": HTTP2_AVAILABLE,
+            "limits": httpx.Limits(
+                max_connections=32,
+                max_keepalive_connections=16,
+                keepalive_expiry=60,
+            ),
+        }
+        try:
+            return genai.Client(
+                api_key=self.api_key,
+                http_options=types.HttpOptions(
+                    timeout=config.gemini_timeout_ms,
+                    **{"async_client_args" if for_async else "client_args": transport_args},
+                ),
+            )
+        except (TypeError, ValueError) as e:
+            self.logger.debug(f"Pooled HTTP options unsupported, using defaults: {e}")
+            return genai.Client(api_key=self.api_key)
+    
     def _acquire_rate_limit(self):
         """Acquire rate limit before making API call."""
         if self._rate_limiter:
@@ -69,9 +379,94 @@ class GeminiClient:
     def is_available(self) -> bool:
         return self.client is not None
     
-    def _encode_image(self, image_path: Path) -> bytes:
+    def _encode_image(self, image_path: Path) -> mmap.mmap:
+        """Map a screenshot file read-only instead of copying it onto the heap."""
         with open(image_path, "rb") as f:
-            return f.read()
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    @contextmanager
+    def _mapped_image(self, image_path: Path) -> Iterator[mmap.mmap]:
+        """
+        Map a screenshot for the duration of one API call, then unmap it.
+        
+        Pages are faulted in as the decoder reads them, so batch jobs over
+        hundreds of screenshots never hold whole files on the Python heap.
+        """
+        mapped = self._encode_image(image_path)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+    
+    def _prepare_image(
+        self,
+        image_bytes: Union[bytes, mmap.mmap],
+        max_dim: int = 1024,
+        quality: int = 80,
+        image_format: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """
+        Downscale and recompress a screenshot for upload.
+        
+        Image tokens dominate request cost, so a 1024px WebP/JPEG is far
+        cheaper than a full-resolution PNG. Returns (bytes, mime_type);
+        falls back to the original PNG if Pillow is unavailable or fails.
+        A mapped file is decoded in place without copying it first.
+        image_format overrides the default upload format (e.g. "JPEG").
+        """
+        if not PIL_AVAILABLE:
+            return self._as_bytes(image_bytes), "image/png"
+        
+        try:
+            if isinstance(image_bytes, mmap.mmap):
+                image_bytes.seek(0)
+                source = image_bytes
+            else:
+                source = io.BytesIO(image_bytes)
+            with Image.open(source) as im:
+                im.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+                buf = io.BytesIO()
+                im.convert("RGB").save(buf, image_format or UPLOAD_FORMAT, quality=quality)
+            mime_type = f"image/{image_format.lower()}" if image_format else UPLOAD_MIME
+            return buf.getvalue(), mime_type
+        except Exception as e:
+            self.logger.debug(f"Image preparation failed, sending original: {e}")
+            return self._as_bytes(image_bytes), "image/png"
+    
+    @staticmethod
+    def _as_bytes(image_bytes: Union[bytes, mmap.mmap]) -> bytes:
+        # Part.from_bytes needs real bytes; only the unscaled fallback pays for the copy
+        return image_bytes if isinstance(image_bytes, bytes) else image_bytes[:]
+    
+    def _extract_json(self, response) -> Optional[Any]:
+        """
+        Decoded body of a JSON-mode response.
+        
+        Uses the SDK's typed response.parsed when a response_schema was
+        given, otherwise parses response.text directly - JSON mode
+        guarantees plain JSON, so no part walking or fence stripping.
+        Blocked or empty responses return None.
+        """
+        feedback = response.prompt_feedback
+        if feedback is not None and feedback.block_reason:
+            self.logger.warning(f"Prompt blocked: {feedback.block_reason}")
+            return None
+        
+        parsed = response.parsed
+        if parsed is not None:
+            # Typed schemas decode to pydantic models; cache and callers want plain data
+            if isinstance(parsed, BaseModel):
+                return parsed.model_dump()
+            if isinstance(parsed, list):
+                return [p.model_dump() if isinstance(p, BaseModel) else p for p in parsed]
+            return parsed
+        
+        try:
+            text = response.text
+        except ValueError as e:
+            self.logger.warning(f"No text in response: {e}")
+            return None
+        return self._parse_json_response(text)
     
     def _safe_extract_text(self, response) -> Optional[str]:
         """Safely extract text from Gemini response."""
@@ -99,51 +494,277 @@ class GeminiClient:
             return None
     
     def _parse_json_response(self, text: str) -> Optional[Dict[str, Any]]:
-        """Parse JSON from response, handling markdown code blocks."""
+        """Parse a JSON-mode response (response_mime_type="application/json")."""
         if not text:
             return None
-            
-        cleaned = text.strip()
-        
-        if cleaned.startswith("```json"):
-            cleaned = cleaned[7:]
-        elif cleaned.startswith("```"):
-            cleaned = cleaned[3:]
-        
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]
         
         try:
-            return json.loads(cleaned.strip())
+            return _json_loads(text)
         except json.JSONDecodeError as e:
             self.logger.error(f"Failed to parse JSON: {e}")
             self.logger.debug(f"Response was: {text[:500]}")
             return None
     
     # =========================================================================
-    # COMPILE PHASE: Visual Analysis (uses VISION model)
+    # VISION REQUESTS (shared by sync and async paths)
     # =========================================================================
-    
-    def analyze_extraction_page(
-        self,
-        screenshot_path: Path,
-        copied_value: str,
-        voice_hints: Optional[List[str]] = None
-    ) -> Optional[Dict[str, Any]]:
+
+    def _vision_contents(self, prompt: str, image_bytes: bytes, mime_type: str = "image/png") -> List[Any]:
+        return [
+            types.Content(role="user", parts=[
+                _text_part(prompt),
+                types.Part.from_bytes(data=image_bytes, mime_type=mime_type)
+            ])
+        ]
+
+    # =========================================================================
+    # THROTTLING AND RETRIES
+    # =========================================================================
+
+    def _get_gate(self, model: str) -> _AdaptiveGate:
+        """Concurrency gate for async calls to model on the running event loop."""
+        gates = self._gates.setdefault(asyncio.get_running_loop(), {})
+        gate = gates.get(model)
+        if gate is None:
+            gate = gates[model] = _AdaptiveGate(self._concurrency.get(model, 1))
+        return gate
+
+    def _aio_models(self):
+        """Async models API on a client owned by the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._aio_clients.get(loop)
+        if client is None:
+            client = self._aio_clients[loop] = self._create_client(for_async=True)
+        return client.aio.models
+
+    def _estimate_tokens(self, prompt: str, image_count: int, gen_config) -> int:
+        """Rough, padded token cost of a request for the TPM reservation."""
+        output_tokens = getattr(gen_config, "max_output_tokens", None) or 0
+        estimate = len(prompt) // 4 + image_count * self.IMAGE_TOKEN_ESTIMATE + output_tokens
+        return int(estimate * self.TOKEN_SAFETY_MULTIPLIER)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
         """
-        Analyze a page where user performed extraction (copy).
+        Seconds to wait before retrying after error, or None to give up.
         
-        Uses the VISION model (not Computer Use) for analysis.
-        IMPORTANT: Field names should be GENERIC (e.g., "name", "address") 
-        not specific to the content (e.g., NOT "the_bier_library").
+        On 429 the server's retryDelay (when present) becomes a cooldown
+        that every caller respects, not just this one.
         """
-        if not self.is_available:
+        code = getattr(error, "code", None)
+        if code not in _RETRYABLE_CODES or attempt + 1 >= self.MAX_ATTEMPTS:
             return None
         
+        delay = min(self.BACKOFF_MAX, self.BACKOFF_INITIAL * 2 ** attempt) + random.uniform(0, 1)
+        if code == 429:
+            match = _RETRY_DELAY_RE.search(str(error))
+            if match:
+                delay = max(delay, float(match.group(1)))
+            self._retry_after = max(self._retry_after, time.monotonic() + delay)
+        
+        self.logger.warning(f"Gemini call failed ({code}), retry {attempt + 1}/{self.MAX_ATTEMPTS - 1} in {delay:.1f}s")
+        return delay
+
+    def _before_call(self, est_tokens: int):
+        """Wait out any 429 cooldown, then take TPM budget and an RPM slot."""
+        cooldown = self._retry_after - time.monotonic()
+        if cooldown > 0:
+            time.sleep(cooldown)
+        self._tpm_bucket.reserve(est_tokens)
+        self._acquire_rate_limit()
+
+    async def _before_call_async(self, est_tokens: int):
+        cooldown = self._retry_after - time.monotonic()
+        if cooldown > 0:
+            await asyncio.sleep(cooldown)
+        await self._tpm_bucket.areserve(est_tokens)
+        # The limiter sleeps, so wait for it off the event loop
+        await asyncio.to_thread(self._acquire_rate_limit)
+
+    def _generate(self, model: str, contents: List[Any], gen_config, est_tokens: int):
+        """generate_content with throttling and jittered exponential backoff."""
+        attempt = 0
+        while True:
+            self._before_call(est_tokens)
+            try:
+                return self.client.models.generate_content(model=model, contents=contents, config=gen_config)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def _generate_async(self, model: str, contents: List[Any], gen_config, est_tokens: int):
+        """Async _generate; also halves the model's concurrency ceiling on 429."""
+        gate = self._get_gate(model)
+        attempt = 0
+        while True:
+            await self._before_call_async(est_tokens)
+            try:
+                async with gate:
+                    response = await self._aio_models().generate_content(
+                        model=model, contents=contents, config=gen_config
+                    )
+                gate.succeed()
+                return response
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                if getattr(e, "code", None) == 429:
+                    gate.throttle()
+                    self.logger.info(f"Concurrency for {model} reduced to {gate.limit}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _get_cache(self) -> Optional[DiskCache]:
+        if self._cache is None and config.gemini_cache_enabled:
+            try:
+                self._cache = DiskCache(config.cache_dir / "gemini.sqlite", ttl=config.gemini_cache_ttl)
+            except Exception as e:
+                self.logger.warning(f"Response cache unavailable: {e}")
+        return self._cache
+
+    @staticmethod
+    def _cache_key(model: str, prompt: str, image_bytes: bytes, gen_config, downscale: bool = False) -> str:
+        """Content address of a request: image, prompt, model and config."""
+        h = hashlib.blake2b(digest_size=20)
+        h.update(image_bytes)
+        h.update(b"\0")
+        h.update(prompt.encode())
+        h.update(b"\0")
+        h.update(f"{model}|{gen_config!r}|{downscale}".encode())
+        return h.hexdigest()
+
+    def _cache_lookup(self, key: str) -> Optional[Any]:
+        cache = self._get_cache()
+        if cache is None:
+            return None
+        result = cache.get(key)
+        if result is not None:
+            self.logger.debug(f"Gemini cache hit: {key[:12]}")
+        return result
+
+    def _cache_store(self, key: str, result: Optional[Any]):
+        # None covers safety blocks and unparseable output - never cache those
+        if result is not None and self._cache is not None:
+            self._cache.set(key, result)
+
+    def _vision_generate(
+        self,
+        prompt: str,
+        image_bytes: bytes,
+        gen_config,
+        downscale: bool = False
+    ) -> Optional[Any]:
+        """
+        Run one VISION model call and return the parsed JSON response.
+        
+        With downscale=True the screenshot is shrunk and recompressed
+        before upload; leave it off when pixel coordinates matter.
+        """
+        key = self._cache_key(self.VISION_MODEL, prompt, image_bytes, gen_config, downscale)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return cached
+        
+        mime_type = "image/png"
+        if downscale:
+            image_bytes, mime_type = self._prepare_image(image_bytes)
+        
+        response = self._generate(
+            self.VISION_MODEL,
+            self._vision_contents(prompt, image_bytes, mime_type),
+            gen_config,
+            self._estimate_tokens(prompt, 1, gen_config),
+        )
+        result = self._extract_json(response)
+        self._cache_store(key, result)
+        return result
+
+    async def _vision_generate_async(
+        self,
+        prompt: str,
+        image_bytes: bytes,
+        gen_config,
+        downscale: bool = False
+    ) -> Optional[Any]:
+        """Async counterpart of _vision_generate, gated by the model's concurrency limit."""
+        key = self._cache_key(self.VISION_MODEL, prompt, image_bytes, gen_config, downscale)
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        while True:
+            cached = self._cache_lookup(key)
+            if cached is not None:
+                return cached
+            
+            # Identical request already on the wire - share its result
+            pending = inflight.get(key)
+            if pending is None:
+                break
+            self.logger.debug(f"Joining in-flight Gemini request: {key[:12]}")
+            try:
+                return await asyncio.shield(pending)
+            except _InflightAbandoned:
+                # Its owner was cancelled, not us - look again, maybe as owner
+                continue
+        
+        # No await between the lookup above and this insert, and only this
+        # loop's thread touches inflight, so no lock is needed
+        future = loop.create_future()
+        inflight[key] = future
+        try:
+            result = await self._vision_call_async(key, prompt, image_bytes, gen_config, downscale)
+        except asyncio.CancelledError:
+            # Joiners retry on their own instead of inheriting our cancellation
+            future.set_exception(_InflightAbandoned())
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del inflight[key]
+
+    async def _vision_call_async(
+        self,
+        key: str,
+        prompt: str,
+        image_bytes: bytes,
+        gen_config,
+        downscale: bool
+    ) -> Optional[Any]:
+        mime_type = "image/png"
+        if downscale:
+            image_bytes, mime_type = await asyncio.to_thread(self._prepare_image, image_bytes)
+        
+        response = await self._generate_async(
+            self.VISION_MODEL,
+            self._vision_contents(prompt, image_bytes, mime_type),
+            gen_config,
+            self._estimate_tokens(prompt, 1, gen_config),
+        )
+        result = self._extract_json(response)
+        self._cache_store(key, result)
+        return result
+
+    # =========================================================================
+    # COMPILE PHASE: Visual Analysis (uses VISION model)
+    # =========================================================================
+
+    def _analyze_extraction_request(
+        self,
+        copied_value: str,
+        voice_hints: Optional[List[str]]
+    ) -> Tuple[str, Any]:
         voice_context = ""
         if voice_hints:
             voice_context = f"\nUser voice hints: {', '.join(voice_hints)}"
-        
+
         prompt = f"""Analyze this screenshot where the user copied: "{copied_value}"
 {voice_context}
 
@@ -182,80 +803,129 @@ Return JSON:
 
 Remember: Field names must be GENERIC and reusable, not specific content values!"""
 
+        return prompt, self._ANALYZE_EXTRACTION_CONFIG
+
+    def _analyze_extraction_result(self, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result:
+            self.logger.info(f"Analyzed extraction page: {len(result.get('all_fields', {}))} fields found")
+        return result
+
+    def analyze_extraction_page(
+        self,
+        screenshot_path: Path,
+        copied_value: str,
+        voice_hints: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Analyze a page where user performed extraction (copy).
+
+        Uses the VISION model (not Computer Use) for analysis.
+        IMPORTANT: Field names should be GENERIC (e.g., "name", "address")
+        not specific to the content (e.g., NOT "the_bier_library").
+        """
+        if not self.is_available:
+            return None
+
+        prompt, gen_config = self._analyze_extraction_request(copied_value, voice_hints)
+
         try:
-            image_bytes = self._encode_image(screenshot_path)
-            
-            # Rate limit before API call
-            self._acquire_rate_limit()
-            
-            # Use VISION model for analysis (NOT Computer Use model)
-            response = self.client.models.generate_content(
-                model=self.VISION_MODEL,  # <-- Key change!
-                contents=[
-                    types.Content(role="user", parts=[
-                        types.Part.from_text(text=prompt),
-                        types.Part.from_bytes(data=image_bytes, mime_type="image/png")
-                    ])
-                ],
-                config=types.GenerateContentConfig(
-                    temperature=0.1,
-                    max_output_tokens=2000,
-                )
-            )
-            
-            text = self._safe_extract_text(response)
-            result = self._parse_json_response(text)
-            
-            if result:
-                self.logger.info(f"Analyzed extraction page: {len(result.get('all_fields', {}))} fields found")
-            
-            return result
-        
+            with self._mapped_image(screenshot_path) as image_bytes:
+                result = self._vision_generate(prompt, image_bytes, gen_config, downscale=True)
+            return self._analyze_extraction_result(result)
+
         except Exception as e:
             self.logger.error(f"Failed to analyze extraction page: {e}")
             return None
-    
-    # =========================================================================
-    # REPLAY PHASE: Extraction (uses VISION model)
-    # =========================================================================
-    
-    def extract_fields(
+
+    async def analyze_extraction_page_async(
         self,
-        screenshot_bytes: bytes,
-        extraction_schema: Dict[str, Any]
-    ) -> Optional[Dict[str, str]]:
-        """
-        Extract structured data from screenshot.
-        
-        Uses the VISION model for extraction.
-        IMPORTANT: Returns data with EXACT field names from schema.
-        """
+        screenshot_path: Path,
+        copied_value: str,
+        voice_hints: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Async version of analyze_extraction_page."""
         if not self.is_available:
             return None
-        
-        # Build the expected field names list
-        expected_fields = list(extraction_schema.keys())
-        
+
+        prompt, gen_config = self._analyze_extraction_request(copied_value, voice_hints)
+
+        try:
+            image_bytes = await asyncio.to_thread(self._encode_image, screenshot_path)
+            try:
+                result = await self._vision_generate_async(prompt, image_bytes, gen_config, downscale=True)
+            finally:
+                image_bytes.close()
+            return self._analyze_extraction_result(result)
+
+        except Exception as e:
+            self.logger.error(f"Failed to analyze extraction page: {e}")
+            return None
+
+    # =========================================================================
+    # REPLAY PHASE: Extraction (uses VISION model)
+    # =========================================================================
+
+    def _extract_fields_request(self, extraction_schema: Dict[str, Any]) -> Tuple[str, Any, Tuple[str, ...]]:
+        # Hashable (name, description, hint) view of the schema, in schema order
+        schema_key = tuple(
+            (field_name, str(field_info.get("description", field_name)), str(field_info.get("visual_hint") or ""))
+            if isinstance(field_info, dict) else (field_name, str(field_info), "")
+            for field_name, field_info in extraction_schema.items()
+        )
+        expected_fields = tuple(field_name for field_name, _, _ in schema_key)
+        return self._extract_fields_prompt(schema_key), self._extract_fields_config(expected_fields), expected_fields
+
+    @staticmethod
+    def _extract_fields_schema(expected_fields: Tuple[str, ...]):
+        # One nullable string per schema field, so the model emits exactly these keys
+        return types.Schema(
+            type=types.Type.OBJECT,
+            properties={f: types.Schema(type=types.Type.STRING, nullable=True) for f in expected_fields},
+            required=list(expected_fields),
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _extract_fields_config(expected_fields: Tuple[str, ...]):
+        """JSON-mode config typed to the schema; output budget scales with field count."""
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=GeminiClient._extract_fields_schema(expected_fields),
+            temperature=0.0,
+            max_output_tokens=min(1000, 64 + 64 * len(expected_fields)),
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _extract_batch_config(expected_fields: Tuple[str, ...]):
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=types.Schema(
+                type=types.Type.ARRAY,
+                items=GeminiClient._extract_fields_schema(expected_fields),
+            ),
+            temperature=0.0,
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _extract_fields_prompt(schema_key: Tuple[Tuple[str, str, str], ...]) -> str:
+        """Prompt for one schema; replays reuse the same schema across many pages."""
         fields_desc = []
-        for field_name, field_info in extraction_schema.items():
-            if isinstance(field_info, dict):
-                desc = field_info.get("description", field_name)
-                hint = field_info.get("visual_hint", "")
-            else:
-                desc = str(field_info)
-                hint = ""
+        for field_name, desc, hint in schema_key:
             if hint:
                 fields_desc.append(f"- {field_name}: {desc} (look for: {hint})")
             else:
                 fields_desc.append(f"- {field_name}: {desc}")
-        
+
         fields_str = "\n".join(fields_desc)
-        
-        prompt = f"""Extract these fields from the screenshot:
+        expected_fields = [field_name for field_name, _, _ in schema_key]
+
+        return f"""Extract these fields from the screenshot:
 
     {fields_str}
 
-    Return ONLY valid JSON with extracted values. 
+    Return ONLY valid JSON with extracted values.
     IMPORTANT: Use EXACTLY these field names (copy them exactly):
     {{{", ".join([f'"{f}": "value or null"' for f in expected_fields])}}}
 
@@ -265,56 +935,125 @@ Remember: Field names must be GENERIC and reusable, not specific content values!
     - Don't make up values
     - Field names must match EXACTLY as specified above"""
 
+    def _extract_fields_result(
+        self,
+        result: Optional[Dict[str, Any]],
+        expected_fields: Tuple[str, ...]
+    ) -> Optional[Dict[str, str]]:
+        if result:
+            # Normalize field names to match schema (handle singular/plural mismatches)
+            normalized = self._normalize_field_names(result, expected_fields)
+            normalized = {k: v for k, v in normalized.items() if v is not None}
+            self.logger.info(f"Extracted {len(normalized)} fields")
+            return normalized
+
+        return result
+
+    def extract_fields(
+        self,
+        screenshot_bytes: bytes,
+        extraction_schema: Dict[str, Any]
+    ) -> Optional[Dict[str, str]]:
+        """
+        Extract structured data from screenshot.
+
+        Uses the VISION model for extraction.
+        IMPORTANT: Returns data with EXACT field names from schema.
+        """
+        if not self.is_available:
+            return None
+
+        prompt, gen_config, expected_fields = self._extract_fields_request(extraction_schema)
+
         try:
-            # Rate limit before API call
-            self._acquire_rate_limit()
-            
-            response = self.client.models.generate_content(
-                model=self.VISION_MODEL,
-                contents=[
-                    types.Content(role="user", parts=[
-                        types.Part.from_text(text=prompt),
-                        types.Part.from_bytes(data=screenshot_bytes, mime_type="image/png")
-                    ])
-                ],
-                config=types.GenerateContentConfig(
-                    temperature=0.0,
-                    max_output_tokens=1000,
-                )
-            )
-            
-            text = self._safe_extract_text(response)
-            result = self._parse_json_response(text)
-            
-            if result:
-                # Normalize field names to match schema (handle singular/plural mismatches)
-                normalized = self._normalize_field_names(result, expected_fields)
-                normalized = {k: v for k, v in normalized.items() if v is not None}
-                self.logger.info(f"Extracted {len(normalized)} fields")
-                return normalized
-            
-            return result
-        
+            result = self._vision_generate(prompt, screenshot_bytes, gen_config)
+            return self._extract_fields_result(result, expected_fields)
+
         except Exception as e:
             self.logger.error(f"Field extraction failed: {e}")
             return None
-    
-    def extract_page_data(
+
+    async def extract_fields_async(
         self,
         screenshot_bytes: bytes,
-        context: str = ""
+        extraction_schema: Dict[str, Any]
     ) -> Optional[Dict[str, str]]:
+        """Async version of extract_fields."""
+        if not self.is_available:
+            return None
+
+        prompt, gen_config, expected_fields = self._extract_fields_request(extraction_schema)
+
+        try:
+            result = await self._vision_generate_async(prompt, screenshot_bytes, gen_config)
+            return self._extract_fields_result(result, expected_fields)
+
+        except Exception as e:
+            self.logger.error(f"Field extraction failed: {e}")
+            return None
+
+    async def batch_extract_fields(
+        self,
+        screenshots: List[bytes],
+        extraction_schema: Dict[str, Any]
+    ) -> List[Optional[Dict[str, str]]]:
         """
-        Extract all relevant data from a page without a predefined schema.
+        Extract the same schema from many screenshots concurrently.
+
+        Requests overlap up to the configured concurrency; results are
+        returned in input order. Sync callers can use asyncio.run().
+        """
+        return await asyncio.gather(
+            *(self.extract_fields_async(b, extraction_schema) for b in screenshots)
+        )
+
+    def extract_fields_stream(
+        self,
+        screenshot_bytes: bytes,
+        extraction_schema: Dict[str, Any]
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Stream extracted fields as the model writes them.
         
-        This is useful when you don't know what fields will be on the page.
-        Uses the VISION model for extraction.
+        Yields (field_name, value) with field names normalized to the
+        schema, as soon as each member of the JSON response is complete,
+        so callers can act on early fields before the response finishes.
+        Null values are skipped, matching extract_fields.
         """
         if not self.is_available:
-            return None
+            return
         
-        context_hint = f"\nContext: The user was searching for {context}" if context else ""
+        prompt, gen_config, expected_fields = self._extract_fields_request(extraction_schema)
+        parser = _StreamingObjectParser()
+        
+        try:
+            self._before_call(self._estimate_tokens(prompt, 1, gen_config))
+            stream = self.client.models.generate_content_stream(
+                model=self.VISION_MODEL,
+                contents=self._vision_contents(prompt, screenshot_bytes),
+                config=gen_config,
+            )
+            
+            count = 0
+            for chunk in stream:
+                text = chunk.text
+                if not text:
+                    continue
+                for key, value in parser.feed(text):
+                    if value is None:
+                        continue
+                    for name, normalized in self._normalize_field_names({key: value}, expected_fields).items():
+                        count += 1
+                        yield name, normalized
+            
+            self.logger.info(f"Streamed {count} fields")
         
+        except Exception as e:
+            self.logger.error(f"Streaming field extraction failed: {e}")
+
+    def _extract_page_data_request(self, context: str) -> Tuple[str, Any]:
+        context_hint = f"\nContext: The user was searching for {context}" if context else ""
+
         prompt = f"""Look at this screenshot and extract ALL relevant information visible on the page.{context_hint}
 
 This appears to be a detail/information page. Extract:
@@ -346,174 +1085,528 @@ Rules:
 - Extract exact text as shown
 - Use descriptive field names in snake_case"""
 
+        return prompt, self._EXTRACT_PAGE_DATA_CONFIG
+
+    def _extract_page_data_result(self, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+        if result:
+            # Filter out null values
+            result = {k: v for k, v in result.items() if v is not None and v != "null"}
+            self.logger.info(f"Auto-extracted {len(result)} fields")
+            return result
+
+        return None
+
+    def extract_page_data(
+        self,
+        screenshot_bytes: bytes,
+        context: str = ""
+    ) -> Optional[Dict[str, str]]:
+        """
+        Extract all relevant data from a page without a predefined schema.
+
+        This is useful when you don't know what fields will be on the page.
+        Uses the VISION model for extraction.
+        """
+        if not self.is_available:
+            return None
+
+        # Reuse a fused analyze_page result for this screenshot if we have one
+        analysis = self._get_page_analysis(self._page_digest(screenshot_bytes), None)
+        fields = analysis.get("extracted_fields") if analysis else None
+        if fields and isinstance(fields, dict):
+            return self._extract_page_data_result(fields)
+
+        prompt, gen_config = self._extract_page_data_request(context)
+
+        try:
+            result = self._vision_generate(prompt, screenshot_bytes, gen_config, downscale=True)
+            return self._extract_page_data_result(result)
+
+        except Exception as e:
+            self.logger.error(f"Auto extraction failed: {e}")
+            return None
+
+    async def extract_page_data_async(
+        self,
+        screenshot_bytes: bytes,
+        context: str = ""
+    ) -> Optional[Dict[str, str]]:
+        """Async version of extract_page_data."""
+        if not self.is_available:
+            return None
+
+        # Reuse a fused analyze_page result for this screenshot if we have one
+        analysis = self._get_page_analysis(self._page_digest(screenshot_bytes), None)
+        fields = analysis.get("extracted_fields") if analysis else None
+        if fields and isinstance(fields, dict):
+            return self._extract_page_data_result(fields)
+
+        prompt, gen_config = self._extract_page_data_request(context)
+
+        try:
+            result = await self._vision_generate_async(prompt, screenshot_bytes, gen_config, downscale=True)
+            return self._extract_page_data_result(result)
+
+        except Exception as e:
+            self.logger.error(f"Auto extraction failed: {e}")
+            return None
+
+
+    def _normalize_field_names(
+        self,
+        extracted: Dict[str, Any],
+        expected_fields: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Normalize extracted field names to match expected schema.
+
+        Handles:
+        - Singular/plural mismatches (dining_rating → dining_ratings)
+        - Case differences
+        - Common variations
+        """
+        alias_map = self._build_alias_map(tuple(expected_fields))
+        normalized = {}
+        for key, value in extracted.items():
+            # Keep original if no match
+            normalized[alias_map.get(key.lower(), key)] = value
+        return normalized
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _build_alias_map(expected_fields: Tuple[str, ...]) -> Dict[str, str]:
+        """
+        Map every accepted lowercase spelling to its schema field name.
+
+        Built once per schema. Exact names win over variants, and earlier
+        fields win over later ones when two variants collide.
+        """
+        alias_map = {f.lower(): f for f in reversed(expected_fields)}
+
+        for field_name in expected_fields:
+            lower = field_name.lower()
+            variants = [
+                lower[:-1] if lower.endswith('s') else None,
+                lower + 's',
+                lower.replace('_ratings', '_rating'),
+                lower.replace('_rating', '_ratings'),
+                'number_of_' + lower,
+                lower[len('number_of_'):] if lower.startswith('number_of_') else None,
+            ]
+            for variant in variants:
+                if variant:
+                    alias_map.setdefault(variant, field_name)
+
+        return alias_map
+
+    # =========================================================================
+    # REPLAY PHASE: Page Analysis (classify + validate + extract in one call)
+    # =========================================================================
+
+    def _analyze_page_request(self, expected_type: Optional[str]) -> Tuple[str, Any]:
+        return self._analyze_page_prompt(expected_type), self._ANALYZE_PAGE_CONFIG
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _analyze_page_prompt(expected_type: Optional[str]) -> str:
+        if expected_type:
+            expected_block = f"""
+Expected page type: "{expected_type}"
+Set "matches_expected" to whether this page is consistent with the expected type.
+Examples of mismatches:
+- Expected "restaurant_detail" but see "search_results" or "list_view" -> false
+- Expected "login_page" but see "home_page" -> false
+"""
+        else:
+            expected_block = '\nNo expected page type was given; set "matches_expected" to null.\n'
+
+        return f"""Analyze this page: classify it, check it against the expected type, and extract its data.
+{expected_block}
+Answer with JSON:
+{{
+    "page_type": "one of: detail_page, list_page, search_results, home_page, login_page, form_page, error_page, other",
+    "is_detail_page": boolean (true if showing details of a single item like a restaurant, product, article),
+    "is_list_page": boolean (true if showing multiple items/results to choose from),
+    "confidence": 0.0-1.0,
+    "description": "brief description of what you see",
+    "matches_expected": boolean or null,
+    "extracted_fields": {{
+        "name": "the main name/title",
+        "address": "full address if visible",
+        "rating": "rating value if shown",
+        ...any other relevant fields visible on the page
+    }}
+}}
+
+Indicators of DETAIL PAGE:
+- Single item with full details (name, description, reviews, images)
+- Page about ONE specific restaurant, product, hotel, person, article
+- Has detailed information, not just a list
+
+Indicators of LIST PAGE:
+- Multiple items/cards/results
+- Grid or list of options
+- Search results, category listing, product catalog
+
+Rules for extracted_fields:
+- Only include fields that are actually visible on the page
+- Extract exact text as shown
+- Use descriptive field names in snake_case"""
+
+    @staticmethod
+    def _page_digest(screenshot_bytes: bytes) -> str:
+        return hashlib.blake2b(screenshot_bytes, digest_size=16).hexdigest()
+
+    def _get_page_analysis(self, digest: str, expected_type: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Memoized analysis for a screenshot, if it answers expected_type."""
+        with self._page_analyses_lock:
+            entry = self._page_analyses.get(digest)
+            if entry is None:
+                return None
+            analysed_for, result = entry
+            if expected_type and expected_type != analysed_for:
+                return None
+            self._page_analyses.move_to_end(digest)
+            return result
+
+    def _put_page_analysis(self, digest: str, expected_type: Optional[str], result: Dict[str, Any]):
+        with self._page_analyses_lock:
+            self._page_analyses[digest] = (expected_type, result)
+            self._page_analyses.move_to_end(digest)
+            while len(self._page_analyses) > self.PAGE_ANALYSIS_CACHE_SIZE:
+                self._page_analyses.popitem(last=False)
+
+    def _analyze_page_result(
+        self,
+        digest: str,
+        expected_type: Optional[str],
+        result: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        if not result:
+            return None
+        self.logger.debug(
+            f"Page analysis: {result.get('page_type')} "
+            f"(match: {result.get('matches_expected')}, "
+            f"{len(result.get('extracted_fields') or {})} fields)"
+        )
+        self._put_page_analysis(digest, expected_type, result)
+        return result
+
+    def analyze_page(
+        self,
+        screenshot_bytes: bytes,
+        expected_type: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Classify, validate and extract a page in a single VISION call.
+
+        Returns the combined result (page_type, is_detail_page, is_list_page,
+        confidence, description, matches_expected, extracted_fields). The
+        result is memoized per screenshot, so classify_page_type,
+        validate_page_type and extract_page_data on the same screenshot
+        reuse it instead of making their own calls.
+        """
+        if not self.is_available:
+            return None
+
+        digest = self._page_digest(screenshot_bytes)
+        cached = self._get_page_analysis(digest, expected_type)
+        if cached is not None:
+            return cached
+
+        prompt, gen_config = self._analyze_page_request(expected_type)
+
         try:
-            response = self.client.models.generate_content(
-                model=self.VISION_MODEL,
-                contents=[
-                    types.Content(role="user", parts=[
-                        types.Part.from_text(text=prompt),
-                        types.Part.from_bytes(data=screenshot_bytes, mime_type="image/png")
-                    ])
-                ],
-                config=types.GenerateContentConfig(
-                    temperature=0.0,
-                    max_output_tokens=1500,
-                )
-            )
-            
-            text = self._safe_extract_text(response)
-            result = self._parse_json_response(text)
-            
-            if result:
-                # Filter out null values
-                result = {k: v for k, v in result.items() if v is not None and v != "null"}
-                self.logger.info(f"Auto-extracted {len(result)} fields")
-                return result
-            
+            result = self._vision_generate(prompt, screenshot_bytes, gen_config, downscale=True)
+            return self._analyze_page_result(digest, expected_type, result)
+
+        except Exception as e:
+            self.logger.warning(f"Page analysis failed: {e}")
             return None
-        
+
+    async def analyze_page_async(
+        self,
+        screenshot_bytes: bytes,
+        expected_type: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Async version of analyze_page."""
+        if not self.is_available:
+            return None
+
+        digest = self._page_digest(screenshot_bytes)
+        cached = self._get_page_analysis(digest, expected_type)
+        if cached is not None:
+            return cached
+
+        prompt, gen_config = self._analyze_page_request(expected_type)
+
+        try:
+            result = await self._vision_generate_async(prompt, screenshot_bytes, gen_config, downscale=True)
+            return self._analyze_page_result(digest, expected_type, result)
+
         except Exception as e:
-            self.logger.error(f"Auto extraction failed: {e}")
+            self.logger.warning(f"Page analysis failed: {e}")
             return None
 
+    @staticmethod
+    def _perceptual_hash(screenshot_bytes: bytes) -> Optional[int]:
+        """64-bit difference hash: near-identical screenshots differ in few bits."""
+        if not PIL_AVAILABLE:
+            return None
+        try:
+            with Image.open(io.BytesIO(screenshot_bytes)) as im:
+                pixels = im.convert("L").resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+        except Exception:
+            return None
+        
+        bits = 0
+        for row in range(0, 72, 9):
+            for col in range(row, row + 8):
+                bits = (bits << 1) | (pixels[col] > pixels[col + 1])
+        return bits
 
-    def _normalize_field_names(
-        self, 
-        extracted: Dict[str, Any], 
-        expected_fields: List[str]
-    ) -> Dict[str, Any]:
+    def _similar_page_check(self, phash: int) -> Optional[Dict[str, Any]]:
+        """Recent classification of a visually near-identical page, if any."""
+        now = time.monotonic()
+        with self._page_analyses_lock:
+            for seen_hash, (stored_at, result) in reversed(self._phash_cache.items()):
+                if now - stored_at > self.PHASH_TTL:
+                    break  # Older entries sit further back
+                if (seen_hash ^ phash).bit_count() <= self.PHASH_MAX_DISTANCE:
+                    return result
+        return None
+
+    def _remember_page_check(self, phash: int, analysis: Dict[str, Any]):
+        # Only the classification survives - extracted fields are page-specific
+        result = {k: analysis.get(k) for k in self._CLASSIFY_KEYS}
+        with self._page_analyses_lock:
+            self._phash_cache[phash] = (time.monotonic(), result)
+            self._phash_cache.move_to_end(phash)
+            while len(self._phash_cache) > self.PHASH_CACHE_SIZE:
+                self._phash_cache.popitem(last=False)
+
+    def _page_check(self, screenshot_bytes: bytes) -> Optional[Dict[str, Any]]:
         """
-        Normalize extracted field names to match expected schema.
+        Page classification for classify_page_type.
         
-        Handles:
-        - Singular/plural mismatches (dining_rating → dining_ratings)
-        - Case differences
-        - Common variations
+        Tries the exact-screenshot memo, then a recent near-identical page
+        by perceptual hash (polling the same page), then analyze_page.
         """
-        normalized = {}
-        expected_lower = {f.lower(): f for f in expected_fields}
+        cached = self._get_page_analysis(self._page_digest(screenshot_bytes), None)
+        if cached is not None:
+            return cached
         
-        for key, value in extracted.items():
-            key_lower = key.lower()
-            
-            # Exact match
-            if key_lower in expected_lower:
-                normalized[expected_lower[key_lower]] = value
-                continue
-            
-            # Try singular/plural variations
-            if key_lower.endswith('s'):
-                singular = key_lower[:-1]
-                if singular in expected_lower:
-                    normalized[expected_lower[singular]] = value
-                    continue
-            else:
-                plural = key_lower + 's'
-                if plural in expected_lower:
-                    normalized[expected_lower[plural]] = value
-                    continue
-            
-            # Try removing/adding common suffixes
-            variations = [
-                key_lower.replace('_rating', '_ratings'),
-                key_lower.replace('_ratings', '_rating'),
-                key_lower.replace('number_of_', ''),
-                'number_of_' + key_lower,
-            ]
-            
-            matched = False
-            for var in variations:
-                if var in expected_lower:
-                    normalized[expected_lower[var]] = value
-                    matched = True
-                    break
-            
-            if not matched:
-                # Keep original if no match
-                normalized[key] = value
+        phash = self._perceptual_hash(screenshot_bytes)
+        if phash is not None:
+            similar = self._similar_page_check(phash)
+            if similar is not None:
+                self.logger.debug("Page check served from perceptual-hash cache")
+                return similar
         
-        return normalized
+        analysis = self.analyze_page(screenshot_bytes)
+        if analysis and phash is not None:
+            self._remember_page_check(phash, analysis)
+        return analysis
+
+    async def _page_check_async(self, screenshot_bytes: bytes) -> Optional[Dict[str, Any]]:
+        cached = self._get_page_analysis(self._page_digest(screenshot_bytes), None)
+        if cached is not None:
+            return cached
+        
+        phash = await asyncio.to_thread(self._perceptual_hash, screenshot_bytes)
+        if phash is not None:
+            similar = self._similar_page_check(phash)
+            if similar is not None:
+                self.logger.debug("Page check served from perceptual-hash cache")
+                return similar
+        
+        analysis = await self.analyze_page_async(screenshot_bytes)
+        if analysis and phash is not None:
+            self._remember_page_check(phash, analysis)
+        return analysis
+
+    def _validate_page_type_result(self, analysis: Optional[Dict[str, Any]]) -> bool:
+        if analysis:
+            match = analysis.get("matches_expected")
+            self.logger.info(f"Page validation: match={match}, actual={analysis.get('page_type')}")
+            if match is not None:
+                return bool(match)
+
+        return True  # Fail open
 
     def validate_page_type(self, screenshot_bytes: bytes, expected_type: str) -> bool:
         """
         Verify if the page matches the expected type (e.g. "restaurant_detail").
-        
+
         Returns:
             True if page matches expected type (or if unsure)
             False if page clearly does NOT match (e.g. asking for detail but seeing list)
         """
         if not self.is_available:
             return True
-            
-        prompt = f"""Look at this screenshot.
-        Expected page type: "{expected_type}"
 
-        Is this page consistent with the expected type?
-        
-        Examples of mismatches:
-        - Expected "restaurant_detail" but see "search_results" or "list_view" -> NO
-        - Expected "login_page" but see "home_page" -> NO
-        
-        Answer with a JSON object:
-        {{
-            "match": boolean,
-            "actual_type": "string description of what you see"
-        }}
-        """
-        
-        try:
-            response = self.client.models.generate_content(
-                model=self.VISION_MODEL,
-                contents=[
-                    types.Content(role="user", parts=[
-                        types.Part.from_text(text=prompt),
-                        types.Part.from_bytes(data=screenshot_bytes, mime_type="image/png")
-                    ])
-                ],
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.0
-                )
-            )
-            
-            text = self._safe_extract_text(response)
-            if not text:
-                 return True
-                 
-            result = self._parse_json_response(text)
-            if result:
-                self.logger.info(f"Page validation: {result}")
-                return result.get("match", True)
-            
+        # Exact screenshot only: near-identical pages may be different pages
+        return self._validate_page_type_result(self.analyze_page(screenshot_bytes, expected_type))
+
+    async def validate_page_type_async(self, screenshot_bytes: bytes, expected_type: str) -> bool:
+        """Async version of validate_page_type."""
+        if not self.is_available:
             return True
-            
-        except Exception as e:
-            self.logger.warning(f"Page validation failed: {e}")
-            return True  # Fail open
-    
+
+        return self._validate_page_type_result(await self.analyze_page_async(screenshot_bytes, expected_type))
+
+    def _classify_page_type_result(self, analysis: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not analysis:
+            return None
+        result = {k: analysis.get(k) for k in self._CLASSIFY_KEYS}
+        self.logger.debug(f"Page classification: {result.get('page_type')} (confidence: {result.get('confidence', 'N/A')})")
+        return result
+
     def classify_page_type(self, screenshot_bytes: bytes) -> Optional[Dict[str, Any]]:
         """
         Classify the type of page we're currently on.
-        
+
         This is used for STATE AWARENESS - detecting if we're already on
         the target page type before attempting navigation.
-        
+
         Returns:
             Dict with 'page_type' key: 'list_page', 'detail_page', 'search_results', 'home', etc.
         """
         if not self.is_available:
             return None
-        
-        prompt = """Classify this page. What type of page is this?
 
-Answer with JSON:
-{
-    "page_type": "one of: detail_page, list_page, search_results, home_page, login_page, form_page, error_page, other",
-    "is_detail_page": boolean (true if showing details of a single item like a restaurant, product, article),
-    "is_list_page": boolean (true if showing multiple items/results to choose from),
-    "confidence": 0.0-1.0,
-    "description": "brief description of what you see"
-}
+        return self._classify_page_type_result(self._page_check(screenshot_bytes))
+
+    async def classify_page_type_async(self, screenshot_bytes: bytes) -> Optional[Dict[str, Any]]:
+        """Async version of classify_page_type."""
+        if not self.is_available:
+            return None
+
+        return self._classify_page_type_result(await self._page_check_async(screenshot_bytes))
+
+    # =========================================================================
+    # REPLAY PHASE: Multi-image batches (one request, many screenshots)
+    # =========================================================================
+
+    def _batch_size(self) -> int:
+        """Images per request, keeping image tokens within 60% of the TPM budget."""
+        by_tpm = int(config.gemini_tpm_limit * 0.6) // self.IMAGE_TOKEN_ESTIMATE
+        return max(1, min(self.BATCH_MAX_IMAGES, by_tpm))
+
+    def _batch_generate(self, prompt: str, images: List[bytes], gen_config) -> List[Optional[Dict[str, Any]]]:
+        """
+        Send several screenshots in one VISION request.
+
+        The model answers with a JSON array aligned to image order; missing
+        or malformed entries come back as None.
+        """
+        h = hashlib.blake2b(digest_size=20)
+        for image_bytes in images:
+            h.update(hashlib.blake2b(image_bytes, digest_size=16).digest())
+        key = self._cache_key(self.VISION_MODEL, prompt, h.digest(), gen_config, True)
+
+        result = self._cache_lookup(key)
+        if result is None:
+            parts = [_text_part(prompt)]
+            for i, image_bytes in enumerate(images, 1):
+                data, mime_type = self._prepare_image(image_bytes)
+                parts.append(_text_part(f"Image {i}:"))
+                parts.append(types.Part.from_bytes(data=data, mime_type=mime_type))
+
+            response = self._generate(
+                self.VISION_MODEL,
+                [types.Content(role="user", parts=parts)],
+                gen_config,
+                self._estimate_tokens(prompt, len(images), gen_config),
+            )
+            result = self._extract_json(response)
+            if isinstance(result, list):
+                self._cache_store(key, result)
+
+        if not isinstance(result, list):
+            return [None] * len(images)
+        if len(result) != len(images):
+            self.logger.warning(f"Batch returned {len(result)} results for {len(images)} images")
+        return [
+            item if isinstance(item, dict) else None
+            for item in (result + [None] * len(images))[:len(images)]
+        ]
+
+    def classify_pages_batch(self, screenshots: List[bytes]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Classify many screenshots with as few requests as possible.
+
+        Packs up to _batch_size() images into each request instead of one
+        request per image, which is what exhausts the RPM limit. Returns
+        one classify_page_type-style dict (or None) per screenshot.
+        """
+        if not self.is_available:
+            return [None] * len(screenshots)
+
+        results: List[Optional[Dict[str, Any]]] = []
+        size = self._batch_size()
+        for start in range(0, len(screenshots), size):
+            chunk = screenshots[start:start + size]
+            try:
+                results.extend(self._batch_generate(
+                    self._classify_batch_prompt(len(chunk)), chunk, self._CLASSIFY_BATCH_CONFIG
+                ))
+            except Exception as e:
+                self.logger.debug(f"Batch page classification failed: {e}")
+                results.extend([None] * len(chunk))
+
+        self.logger.debug(f"Classified {len(screenshots)} pages in {-(-len(screenshots) // size)} requests")
+        return results
+
+    def extract_pages_batch(
+        self,
+        screenshots: List[bytes],
+        extraction_schema: Dict[str, Any]
+    ) -> List[Optional[Dict[str, str]]]:
+        """
+        Extract the same schema from many screenshots, several per request.
+
+        The schema is declared once per request. Returns one normalized
+        extract_fields-style dict (or None) per screenshot.
+        """
+        if not self.is_available:
+            return [None] * len(screenshots)
+
+        schema_prompt, _, expected_fields = self._extract_fields_request(extraction_schema)
+
+        results: List[Optional[Dict[str, str]]] = []
+        size = self._batch_size()
+        for start in range(0, len(screenshots), size):
+            chunk = screenshots[start:start + size]
+            prompt = (
+                f"You are given {len(chunk)} screenshots of pages with the same layout.\n"
+                f"For EACH image, follow these instructions:\n\n{schema_prompt}\n\n"
+                f"Return a JSON array of exactly {len(chunk)} objects, one per image, in image order."
+            )
+            try:
+                batch = self._batch_generate(prompt, chunk, self._extract_batch_config(expected_fields))
+            except Exception as e:
+                self.logger.error(f"Batch field extraction failed: {e}")
+                batch = [None] * len(chunk)
+            results.extend(self._extract_fields_result(item, expected_fields) for item in batch)
+
+        return results
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _classify_batch_prompt(count: int) -> str:
+        return f"""You are given {count} screenshots, labelled "Image 1" to "Image {count}". Classify each page.
+
+Answer with a JSON array of exactly {count} objects, one per image, in image order:
+[
+    {{
+        "page_type": "one of: detail_page, list_page, search_results, home_page, login_page, form_page, error_page, other",
+        "is_detail_page": boolean (true if showing details of a single item like a restaurant, product, article),
+        "is_list_page": boolean (true if showing multiple items/results to choose from),
+        "confidence": 0.0-1.0,
+        "description": "brief description of what you see"
+    }}
+]
 
 Indicators of DETAIL PAGE:
 - Single item with full details (name, description, reviews, images)
@@ -525,52 +1618,11 @@ Indicators of LIST PAGE:
 - Grid or list of options
 - Search results, category listing, product catalog"""
 
-        try:
-            response = self.client.models.generate_content(
-                model=self.VISION_MODEL,
-                contents=[
-                    types.Content(role="user", parts=[
-                        types.Part.from_text(text=prompt),
-                        types.Part.from_bytes(data=screenshot_bytes, mime_type="image/png")
-                    ])
-                ],
-                config=types.GenerateContentConfig(
-                    temperature=0.0,
-                    max_output_tokens=500,
-                )
-            )
-            
-            text = self._safe_extract_text(response)
-            result = self._parse_json_response(text)
-            
-            if result:
-                self.logger.debug(f"Page classification: {result.get('page_type')} (confidence: {result.get('confidence', 'N/A')})")
-            
-            return result
-        
-        except Exception as e:
-            self.logger.debug(f"Page classification failed: {e}")
-            return None
-    
     # =========================================================================
     # REPLAY PHASE: Element Location (uses VISION model)
     # =========================================================================
-    
-    def find_element(
-        self,
-        screenshot_bytes: bytes,
-        element_description: str,
-        screen_width: int,
-        screen_height: int
-    ) -> Optional[Tuple[int, int]]:
-        """
-        Find element coordinates on screen (fallback when selectors fail).
-        
-        Uses VISION model for element location.
-        """
-        if not self.is_available:
-            return None
-        
+
+    def _find_element_request(self, element_description: str) -> Tuple[str, Any]:
         prompt = f"""Find this element on the screenshot: "{element_description}"
 
 Return JSON with the CENTER coordinates of the element.
@@ -588,45 +1640,75 @@ If not found: {{"found": false, "reason": "explanation"}}
 
 IMPORTANT: Return actual pixel coordinates, not normalized 0-999 values."""
 
+        return prompt, self._FIND_ELEMENT_CONFIG
+
+    def _find_element_result(
+        self,
+        result: Optional[Dict[str, Any]],
+        screen_width: int,
+        screen_height: int
+    ) -> Optional[Tuple[int, int]]:
+        if result and result.get("found"):
+            pixel_x = int(result.get("x", 0))
+            pixel_y = int(result.get("y", 0))
+
+            # Clamp to screen bounds
+            pixel_x = max(0, min(pixel_x, screen_width - 1))
+            pixel_y = max(0, min(pixel_y, screen_height - 1))
+
+            self.logger.info(f"Found element at ({pixel_x}, {pixel_y})")
+            return (pixel_x, pixel_y)
+
+        reason = result.get('reason', 'unknown') if result else 'no response'
+        self.logger.warning(f"Element not found: {reason}")
+        return None
+
+    def find_element(
+        self,
+        screenshot_bytes: bytes,
+        element_description: str,
+        screen_width: int,
+        screen_height: int
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Find element coordinates on screen (fallback when selectors fail).
+
+        Uses VISION model for element location.
+        """
+        if not self.is_available:
+            return None
+
+        prompt, gen_config = self._find_element_request(element_description)
+
         try:
-            # Rate limit before API call
-            self._acquire_rate_limit()
-            
-            response = self.client.models.generate_content(
-                model=self.VISION_MODEL,
-                contents=[
-                    types.Content(role="user", parts=[
-                        types.Part.from_text(text=prompt),
-                        types.Part.from_bytes(data=screenshot_bytes, mime_type="image/png")
-                    ])
-                ],
-                config=types.GenerateContentConfig(
-                    temperature=0.0,
-                )
-            )
-            
-            text = self._safe_extract_text(response)
-            result = self._parse_json_response(text)
-            
-            if result and result.get("found"):
-                pixel_x = int(result.get("x", 0))
-                pixel_y = int(result.get("y", 0))
-                
-                # Clamp to screen bounds
-                pixel_x = max(0, min(pixel_x, screen_width - 1))
-                pixel_y = max(0, min(pixel_y, screen_height - 1))
-                
-                self.logger.info(f"Found element at ({pixel_x}, {pixel_y})")
-                return (pixel_x, pixel_y)
-            
-            reason = result.get('reason', 'unknown') if result else 'no response'
-            self.logger.warning(f"Element not found: {reason}")
+            result = self._vision_generate(prompt, screenshot_bytes, gen_config)
+            return self._find_element_result(result, screen_width, screen_height)
+
+        except Exception as e:
+            self.logger.error(f"Element finding failed: {e}")
             return None
-        
+
+    async def find_element_async(
+        self,
+        screenshot_bytes: bytes,
+        element_description: str,
+        screen_width: int,
+        screen_height: int
+    ) -> Optional[Tuple[int, int]]:
+        """Async version of find_element."""
+        if not self.is_available:
+            return None
+
+        prompt, gen_config = self._find_element_request(element_description)
+
+        try:
+            result = await self._vision_generate_async(prompt, screenshot_bytes, gen_config)
+            return self._find_element_result(result, screen_width, screen_height)
+
         except Exception as e:
             self.logger.error(f"Element finding failed: {e}")
             return None
-    
+
     # =========================================================================
     # REPLAY PHASE: Agentic Computer Use (uses COMPUTER USE model)
     # =========================================================================
@@ -651,26 +1733,16 @@ IMPORTANT: Return actual pixel coordinates, not normalized 0-999 values."""
             return None
         
         try:
-            # Configure Computer Use tool (REQUIRED for this model)
-            config = types.GenerateContentConfig(
-                tools=[
-                    types.Tool(
-                        computer_use=types.ComputerUse(
-                            environment=types.Environment.ENVIRONMENT_BROWSER
-                        )
-                    )
-                ],
-            )
-            
-            response = self.client.models.generate_content(
-                model=self.COMPUTER_USE_MODEL,  # <-- Computer Use model
-                contents=[
+            response = self._generate(
+                self.COMPUTER_USE_MODEL,  # <-- Computer Use model
+                [
                     types.Content(role="user", parts=[
                         types.Part.from_text(text=f"Goal: {goal}"),
                         types.Part.from_bytes(data=screenshot_bytes, mime_type="image/png")
                     ])
                 ],
-                config=config,
+                self._COMPUTER_USE_CONFIG,
+                self._estimate_tokens(goal, 1, self._COMPUTER_USE_CONFIG),
             )
             
             # Extract function call from response
@@ -703,6 +1775,47 @@ IMPORTANT: Return actual pixel coordinates, not normalized 0-999 values."""
             self.logger.error(f"Computer Use action failed: {e}")
             return None
     
+    def _create_prefix_cache(self, prefix: List[Any]) -> Optional[str]:
+        """Cache a Computer Use conversation prefix server-side; returns its name."""
+        try:
+            cache = self.client.caches.create(
+                model=self.COMPUTER_USE_MODEL,
+                config=types.CreateCachedContentConfig(
+                    contents=prefix,
+                    # Tools must live in the cache, not the request, once it is used
+                    tools=self._COMPUTER_USE_CONFIG.tools,
+                    ttl=f"{self.PREFIX_CACHE_TTL_SECONDS}s",
+                ),
+            )
+            self.logger.debug(f"Cached {len(prefix)} conversation turns as {cache.name}")
+            return cache.name
+        except Exception as e:
+            self.logger.debug(f"Prefix cache unavailable, sending full history: {e}")
+            return None
+    
+    def _delete_prefix_cache(self, name: str):
+        try:
+            self.client.caches.delete(name=name)
+        except Exception as e:
+            self.logger.debug(f"Failed to delete prefix cache {name}: {e}")
+    
+    @staticmethod
+    def _elide_screenshots(content):
+        """Copy of a user turn with its images replaced by a text stub."""
+        parts = []
+        for part in content.parts:
+            if part.function_response is not None:
+                fr = part.function_response
+                parts.append(types.Part(function_response=types.FunctionResponse(
+                    name=fr.name,
+                    response={**(fr.response or {}), "screenshot": "elided"},
+                )))
+            elif part.inline_data is not None:
+                parts.append(types.Part.from_text(text="[screenshot elided]"))
+            else:
+                parts.append(part)
+        return types.Content(role=content.role, parts=parts)
+    
     def execute_action_loop(
         self,
         goal: str,
@@ -714,6 +1827,8 @@ IMPORTANT: Return actual pixel coordinates, not normalized 0-999 values."""
         Full agentic computer use loop.
         
         This is the proper way to use Computer Use model for multi-step tasks.
+        Once the history grows, earlier turns are kept in a server-side
+        cached_content prefix so each iteration only uploads the new turn.
         """
         if not self.is_available:
             return False
@@ -732,81 +1847,138 @@ IMPORTANT: Return actual pixel coordinates, not normalized 0-999 values."""
             ])
         )
         
-        config = types.GenerateContentConfig(
-            tools=[
-                types.Tool(
-                    computer_use=types.ComputerUse(
-                        environment=types.Environment.ENVIRONMENT_BROWSER
-                    )
-                )
-            ],
-        )
+        # Indices of user turns that still carry a screenshot
+        screenshot_turns = [0]
         
-        for i in range(max_iterations):
-            self.logger.debug(f"Computer Use iteration {i+1}/{max_iterations}")
-            
-            try:
-                response = self.client.models.generate_content(
-                    model=self.COMPUTER_USE_MODEL,
-                    contents=contents,
-                    config=config,
-                )
-                
-                candidate = response.candidates[0]
-                contents.append(candidate.content)
-                
-                # Check for function calls
-                function_calls = [
-                    part.function_call 
-                    for part in candidate.content.parts 
-                    if hasattr(part, 'function_call') and part.function_call
-                ]
-                
-                if not function_calls:
-                    # No actions - task complete or model gave text response
-                    text = self._safe_extract_text(response)
-                    self.logger.info(f"Computer Use completed: {text[:100] if text else 'No response'}")
-                    return True
+        # Server-side cache of contents[:cached_len], if one is active
+        cache_name: Optional[str] = None
+        cached_len = 0
+        cache_deadline = 0.0
+        use_prefix_cache = True
+        
+        try:
+            for i in range(max_iterations):
+                self.logger.debug(f"Computer Use iteration {i+1}/{max_iterations}")
                 
-                # Execute each action
-                function_responses = []
-                for fc in function_calls:
-                    args = dict(fc.args) if fc.args else {}
+                try:
+                    # Roll the cached prefix forward when it is missing, stale or far behind
+                    if use_prefix_cache and len(contents) >= self.PREFIX_CACHE_MIN_CONTENTS and (
+                        cache_name is None
+                        or len(contents) - cached_len > self.PREFIX_CACHE_REBUILD_CONTENTS
+                        or time.monotonic() > cache_deadline
+                    ):
+                        new_name = self._create_prefix_cache(contents[:-1])
+                        if cache_name:
+                            self._delete_prefix_cache(cache_name)
+                        cache_name = new_name
+                        if new_name:
+                            cached_len = len(contents) - 1
+                            cache_deadline = time.monotonic() + self.PREFIX_CACHE_TTL_SECONDS - 30
+                        else:
+                            use_prefix_cache = False
+                    
+                    if cache_name:
+                        request_contents = contents[cached_len:]
+                        request_config = types.GenerateContentConfig(cached_content=cache_name)
+                    else:
+                        request_contents = contents
+                        request_config = self._COMPUTER_USE_CONFIG
+                    
+                    # Every user turn carries one screenshot
+                    try:
+                        response = self._generate(
+                            self.COMPUTER_USE_MODEL,
+                            request_contents,
+                            request_config,
+                            self._estimate_tokens(goal, (len(request_contents) + 1) // 2, request_config),
+                        )
+                    except Exception as e:
+                        if not cache_name:
+                            raise
+                        # The cache may have been evicted/expired server-side, or
+                        # the cached path rejected the request: drop it and resend
+                        # the full history once
+                        self.logger.warning(f"Cached Computer Use request failed, retrying without prefix cache: {e}")
+                        self._delete_prefix_cache(cache_name)
+                        cache_name = None
+                        use_prefix_cache = False
+                        response = self._generate(
+                            self.COMPUTER_USE_MODEL,
+                            contents,
+                            self._COMPUTER_USE_CONFIG,
+                            self._estimate_tokens(goal, (len(contents) + 1) // 2, self._COMPUTER_USE_CONFIG),
+                        )
+                    
+                    candidate = response.candidates[0]
+                    contents.append(candidate.content)
+                    
+                    # Check for function calls
+                    function_calls = [
+                        part.function_call 
+                        for part in candidate.content.parts 
+                        if hasattr(part, 'function_call') and part.function_call
+                    ]
                     
-                    # Denormalize coordinates
-                    # Note: execute_action_fn should handle the actual execution
-                    action = {"name": fc.name, "args": args}
-                    self.logger.debug(f"Executing: {action}")
+                    if not function_calls:
+                        # No actions - task complete or model gave text response
+                        text = self._safe_extract_text(response)
+                        self.logger.info(f"Computer Use completed: {text[:100] if text else 'No response'}")
+                        return True
                     
-                    execute_action_fn(action)
+                    # Execute each action
+                    function_responses = []
+                    for fc in function_calls:
+                        args = dict(fc.args) if fc.args else {}
+                    
+                        # Denormalize coordinates
+                        # Note: execute_action_fn should handle the actual execution
+                        action = {"name": fc.name, "args": args}
+                        self.logger.debug(f"Executing: {action}")
+                    
+                        execute_action_fn(action)
+                    
+                        # Capture new state
+                        new_screenshot, mime_type = self._prepare_image(
+                            get_screenshot_fn(),
+                            max_dim=self.FEEDBACK_IMAGE_MAX_DIM,
+                            quality=self.FEEDBACK_IMAGE_QUALITY,
+                            image_format="JPEG",
+                        )
                     
-                    # Capture new state
-                    new_screenshot = get_screenshot_fn()
+                        function_responses.append(
+                            types.Part(function_response=types.FunctionResponse(
+                                name=fc.name,
+                                response={"status": "executed"},
+                                parts=[types.FunctionResponsePart(
+                                    inline_data=types.FunctionResponseBlob(
+                                        mime_type=mime_type,
+                                        data=new_screenshot
+                                    )
+                                )]
+                            ))
+                        )
                     
-                    function_responses.append(
-                        types.Part(function_response=types.FunctionResponse(
-                            name=fc.name,
-                            response={"status": "executed"},
-                            parts=[types.FunctionResponsePart(
-                                inline_data=types.FunctionResponseBlob(
-                                    mime_type="image/png",
-                                    data=new_screenshot
-                                )
-                            )]
-                        ))
+                    # Add function responses to conversation
+                    contents.append(
+                        types.Content(role="user", parts=function_responses)
                     )
-                
-                # Add function responses to conversation
-                contents.append(
-                    types.Content(role="user", parts=function_responses)
-                )
-                
-            except Exception as e:
-                self.logger.error(f"Computer Use iteration failed: {e}")
-                return False
+                    
+                    # Keep only the newest screenshots; turns already in the
+                    # server-side prefix cache are untouched there
+                    screenshot_turns.append(len(contents) - 1)
+                    if len(screenshot_turns) > self.FEEDBACK_SCREENSHOTS_KEPT:
+                        oldest = screenshot_turns.pop(0)
+                        contents[oldest] = self._elide_screenshots(contents[oldest])
+                    
+                except Exception as e:
+                    self.logger.error(f"Computer Use iteration failed: {e}")
+                    return False
         
-        self.logger.warning(f"Computer Use hit max iterations ({max_iterations})")
-        return False
+            self.logger.warning(f"Computer Use hit max iterations ({max_iterations})")
+            return False
+        finally:
+            if cache_name:
+                self._delete_prefix_cache(cache_name)
 
 
 # Global instance
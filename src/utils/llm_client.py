@@ -1,27 +1,354 @@
 """LLM client wrapper for OpenAI API calls."""
 import json
+import atexit
+import asyncio
 import base64
+import hashlib
+import io
+import mmap
+import random
+import re
+import threading
+import time
+import wave
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Tuple, Type, Union, Callable, Awaitable
+from pydantic import BaseModel
 from src.utils.logger import setup_logger
 from src.utils.config import config
+from src.utils.rate_limiter import rate_limiters
+from src.utils.disk_cache import DiskCache
+
+# orjson parses several times faster than the stdlib; both raise JSONDecodeError
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+# A response wrapped in a markdown code fence, with or without a language tag
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
 
 # Try to import OpenAI
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI, APIConnectionError, BadRequestError
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
     OpenAI = None
+    AsyncOpenAI = None
+    APIConnectionError = None
+    BadRequestError = None
+
+# Trailing date of a pinned model snapshot, e.g. "gpt-4o-2024-08-06"
+_SNAPSHOT_RE = re.compile(r"-\d{4}-\d{2}-\d{2}$")
+
+# HTTP statuses worth retrying: rate limits and transient server errors
+_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+# Shared sync OpenAI clients keyed by credentials, so every LLMClient
+# with the same key reuses one connection pool
+_CLIENT_CACHE: Dict[str, Any] = {}
+_CLIENT_LOCK = threading.Lock()
+
+# Async clients are pooled per event loop: an httpx AsyncClient's
+# connections belong to the loop that opened them
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def _credentials_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _get_client(api_key: str):
+    """Return the shared sync OpenAI client for api_key."""
+    key = _credentials_key(api_key)
+    with _CLIENT_LOCK:
+        client = _CLIENT_CACHE.get(key)
+        if client is None:
+            # LLMClient retries itself (with jitter and retry-after), so the
+            # SDK's own retries are turned off to avoid compounding them
+            client = OpenAI(api_key=api_key, max_retries=0)
+            _CLIENT_CACHE[key] = client
+            if config.llm_warmup:
+                threading.Thread(target=_warmup, args=(client,), daemon=True).start()
+        return client
+
+
+def _get_async_client(api_key: str):
+    """Return the AsyncOpenAI client for api_key on the running event loop."""
+    loop = asyncio.get_running_loop()
+    key = _credentials_key(api_key)
+    with _CLIENT_LOCK:
+        clients = _ASYNC_CLIENTS.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, max_retries=0)
+            clients[key] = client
+        return client
+
+
+def _warmup(client):
+    """
+    Open a connection to the API in the background.
+    
+    Listing models is free and resolves DNS and completes the TLS
+    handshake, so the first real completion or transcription finds a
+    live connection in the pool.
+    """
+    try:
+        client.models.list()
+    except Exception as e:
+        setup_logger("LLMClient").debug("OpenAI warmup failed: %s", e)
+
+
+def _close_all_clients():
+    """Close pooled sync clients at interpreter exit."""
+    with _CLIENT_LOCK:
+        for client in _CLIENT_CACHE.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _CLIENT_CACHE.clear()
+
+
+atexit.register(_close_all_clients)
+
+
+# Recently encoded images, keyed by (path, mtime_ns, size). Bounded by total
+# base64 size, since one full-resolution screenshot can be several MB
+_ENCODED_IMAGES: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_ENCODED_IMAGES_BUDGET = 32 * 1024 * 1024
+_ENCODED_IMAGES_LOCK = threading.Lock()
+_encoded_images_bytes = 0
+
+
+def _encode_image(image_path: Path) -> str:
+    """
+    Base64-encode an image, reusing the result for unchanged files.
+    
+    The same screenshot is often sent on several turns; the stat-based key
+    invalidates automatically when the file is rewritten.
+    """
+    st = image_path.stat()
+    key = (str(image_path), st.st_mtime_ns, st.st_size)
+    with _ENCODED_IMAGES_LOCK:
+        encoded = _ENCODED_IMAGES.get(key)
+        if encoded is not None:
+            _ENCODED_IMAGES.move_to_end(key)
+            return encoded
+    
+    encoded = _encode_image_file(key[0])
+    
+    global _encoded_images_bytes
+    with _ENCODED_IMAGES_LOCK:
+        if key not in _ENCODED_IMAGES and len(encoded) <= _ENCODED_IMAGES_BUDGET:
+            _ENCODED_IMAGES[key] = encoded
+            _encoded_images_bytes += len(encoded)
+            # Oldest screenshots go first once over the byte budget
+            while _encoded_images_bytes > _ENCODED_IMAGES_BUDGET:
+                _, dropped = _ENCODED_IMAGES.popitem(last=False)
+                _encoded_images_bytes -= len(dropped)
+    return encoded
+
+
+def _split_wav(audio_path: Path, chunk_seconds: float) -> Optional[List[bytes]]:
+    """
+    Slice a WAV file into consecutive chunk_seconds-long WAV blobs.
+    
+    Returns None if the file is not a readable WAV.
+    """
+    try:
+        with wave.open(str(audio_path), "rb") as src:
+            params = src.getparams()
+            frames_per_chunk = max(1, int(chunk_seconds * params.framerate))
+            chunks = []
+            while True:
+                frames = src.readframes(frames_per_chunk)
+                if not frames:
+                    break
+                buf = io.BytesIO()
+                with wave.open(buf, "wb") as dst:
+                    dst.setparams(params)
+                    dst.writeframes(frames)
+                chunks.append(buf.getvalue())
+            return chunks
+    except (wave.Error, EOFError):
+        return None
+
+
+def _parse_json_text(text: str) -> Any:
+    """Parse a JSON completion, unwrapping a markdown code fence if present."""
+    cleaned = text.strip()
+    fenced = _FENCE_RE.match(cleaned)
+    if fenced:
+        cleaned = fenced.group(1)
+    return _json_loads(cleaned)
+
+
+@lru_cache(maxsize=32)
+def _system_prompt_key(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode()).hexdigest()[:32]
+
+
+def _encode_image_file(path: str) -> str:
+    """Base64-encode an image from a read-only mapping rather than a heap copy."""
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return base64.b64encode(mapped).decode("ascii")
+        except ValueError:
+            # Empty files cannot be mapped
+            return ""
+
+
+class _ResponseCache:
+    """
+    In-process LRU cache of completion text with per-entry TTL.
+    
+    Only deterministic (temperature == 0) completions are cached; the key
+    covers every request parameter that can change the response.
+    """
+    
+    def __init__(self, max_size: int = 1000, ttl: float = 1800.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(**params) -> str:
+        return hashlib.sha256(
+            json.dumps(params, sort_keys=True).encode()
+        ).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, text = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return text
+    
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def set(self, key: str, text: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _SemanticCache:
+    """
+    Completion cache matched by prompt embedding similarity.
+    
+    Entries are partitioned by everything except the prompt (model, system
+    prompt, output settings), so only otherwise-identical requests can
+    match. Embeddings are stored unit-normalized as float16, making cosine
+    similarity a single matrix-vector product.
+    """
+    
+    def __init__(self, max_size: int = 500, threshold: float = 0.95):
+        self.max_size = max_size
+        self.threshold = threshold
+        self._partitions: Dict[str, Tuple[Any, List[str]]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, partition: str, embedding) -> Optional[str]:
+        with self._lock:
+            entry = self._partitions.get(partition)
+            if entry is None:
+                return None
+            embeddings, texts = entry
+            scores = embeddings.astype(np.float32) @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            return texts[best]
+    
+    def set(self, partition: str, embedding, text: str):
+        row = embedding.astype(np.float16)[None, :]
+        with self._lock:
+            entry = self._partitions.get(partition)
+            if entry is None:
+                self._partitions[partition] = (row, [text])
+                return
+            embeddings, texts = entry
+            # Oldest entries are dropped first once the partition is full
+            embeddings = np.vstack([embeddings, row])[-self.max_size:]
+            texts = (texts + [text])[-self.max_size:]
+            self._partitions[partition] = (embeddings, texts)
 
 
 class LLMClient:
     """Wrapper for OpenAI API calls with retry and error handling."""
     
+    # Max in-flight requests for acomplete_batch
+    BATCH_CONCURRENCY = 20
+    
+    # Model used to embed prompts for the semantic cache
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    
+    # Rough prompt tokens for one image (gpt-4o, 1024px high detail)
+    IMAGE_TOKEN_ESTIMATE = 765
+    
+    # Completion budget for complete_json; also part of its cache key
+    JSON_MAX_TOKENS = 2000
+    
+    # Models that support structured outputs (JSON Schema responses), by
+    # name; their dated snapshots qualify too, except the ones listed after
+    STRUCTURED_OUTPUT_MODELS = frozenset({
+        "gpt-4o", "gpt-4o-mini",
+        "gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano",
+        "gpt-5", "gpt-5-mini", "gpt-5-nano",
+        "o1", "o3", "o3-mini", "o4-mini",
+    })
+    STRUCTURED_OUTPUT_EXCLUDED = frozenset({"gpt-4o-2024-05-13"})
+    
+    # Retry schedule for transient API errors
+    BACKOFF_INITIAL = 1.0
+    BACKOFF_MAX = 30.0
+    
+    # System prompts at least this long (~1024 tokens) are eligible for
+    # OpenAI's server-side prefix cache
+    PREFIX_CACHE_MIN_CHARS = 4096
+    
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         self.api_key = api_key or config.openai_api_key
         self.model = model or config.llm_model
         self.logger = setup_logger("LLMClient")
+        self._response_cache = _ResponseCache()
+        self._disk_cache: Optional[DiskCache] = None  # Created on first use
+        self._semantic_cache = None
+        if config.semantic_cache_enabled:
+            if NUMPY_AVAILABLE:
+                self._semantic_cache = _SemanticCache(threshold=config.semantic_cache_threshold)
+            else:
+                self.logger.warning("numpy not installed - semantic cache disabled")
         
         if not OPENAI_AVAILABLE:
             self.logger.warning(
@@ -33,8 +360,18 @@ class LLMClient:
             self.logger.warning("No OpenAI API key found. LLM features will be disabled.")
             self.client = None
         else:
-            self.client = OpenAI(api_key=self.api_key)
-            self.logger.info(f"OpenAI client initialized (model: {self.model})")
+            self.client = _get_client(self.api_key)
+            self.logger.info("OpenAI client initialized (model: %s)", self.model)
+    
+    @property
+    def aclient(self):
+        """AsyncOpenAI client bound to the running event loop (None outside one)."""
+        if self.client is None:
+            return None
+        try:
+            return _get_async_client(self.api_key)
+        except RuntimeError:
+            return None
     
     @property
     def is_available(self) -> bool:
@@ -61,10 +398,277 @@ class LLMClient:
         
         Returns:
             Response text or None if failed
+        
+        Deterministic calls (temperature == 0) are served from an in-process
+        cache when the exact same request was made recently, or - with
+        config.semantic_cache_enabled - a near-identical prompt was.
         """
         if not self.client:
             return None
         
+        ticket, cached = self._cached_completion(
+            prompt, system_prompt, temperature, max_tokens, json_response
+        )
+        if cached is not None:
+            return cached
+        
+        kwargs = self._completion_kwargs(
+            prompt, system_prompt, temperature, max_tokens, json_response
+        )
+        
+        estimate = self._estimate_tokens(kwargs["messages"], max_tokens)
+        
+        try:
+            if not rate_limiters.acquire("openai", weight=estimate):
+                self.logger.warning("OpenAI rate limit wait timed out; request not sent")
+                return None
+            response = self._with_retry(lambda: self.client.chat.completions.create(**kwargs))
+            self._reconcile_tokens(estimate, response)
+            return self._completion_result(ticket, response, json_response)
+        
+        except Exception as e:
+            self.logger.exception("LLM completion failed: %s", e)
+            return None
+    
+    async def acomplete(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: int = 2000,
+        json_response: bool = False
+    ) -> Optional[str]:
+        """Async version of complete."""
+        if not self.aclient:
+            return None
+        
+        lookup_args = (prompt, system_prompt, temperature, max_tokens, json_response)
+        if self._semantic_cache is not None:
+            # The semantic lookup makes a blocking embedding request
+            ticket, cached = await asyncio.to_thread(self._cached_completion, *lookup_args)
+        else:
+            ticket, cached = self._cached_completion(*lookup_args)
+        if cached is not None:
+            return cached
+        
+        kwargs = self._completion_kwargs(
+            prompt, system_prompt, temperature, max_tokens, json_response
+        )
+        
+        estimate = self._estimate_tokens(kwargs["messages"], max_tokens)
+        
+        try:
+            if not await rate_limiters.aacquire("openai", weight=estimate):
+                self.logger.warning("OpenAI rate limit wait timed out; request not sent")
+                return None
+            response = await self._awith_retry(lambda: self.aclient.chat.completions.create(**kwargs))
+            self._reconcile_tokens(estimate, response)
+            return self._completion_result(ticket, response, json_response)
+        
+        except Exception as e:
+            self.logger.exception("LLM completion failed: %s", e)
+            return None
+    
+    async def acomplete_batch(
+        self,
+        prompts: List[str],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: int = 2000,
+        json_response: bool = False,
+        max_concurrency: Optional[int] = None
+    ) -> List[Optional[str]]:
+        """
+        Complete many independent prompts concurrently.
+        
+        At most max_concurrency requests are in flight at once. Results are
+        in prompt order; a failed prompt yields None.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.BATCH_CONCURRENCY)
+        
+        async def bounded(prompt: str) -> Optional[str]:
+            async with semaphore:
+                return await self.acomplete(
+                    prompt,
+                    system_prompt=system_prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    json_response=json_response,
+                )
+        
+        results = await asyncio.gather(*(bounded(p) for p in prompts), return_exceptions=True)
+        return [None if isinstance(r, BaseException) else r for r in results]
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after error, or None to give up."""
+        status = getattr(error, "status_code", None)
+        transient = status in _RETRYABLE_STATUS or (
+            APIConnectionError is not None and isinstance(error, APIConnectionError)
+        )
+        if not transient or attempt + 1 >= config.llm_max_attempts:
+            return None
+        
+        delay = min(self.BACKOFF_MAX, self.BACKOFF_INITIAL * 2 ** attempt) + random.uniform(0, 1)
+        if status == 429:
+            response = getattr(error, "response", None)
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            try:
+                delay = max(delay, float(retry_after))
+            except (TypeError, ValueError):
+                pass
+        
+        self.logger.warning(
+            "OpenAI call failed (%s), retry %d/%d in %.1fs",
+            status or type(error).__name__, attempt + 1, config.llm_max_attempts - 1, delay
+        )
+        return delay
+    
+    def _with_retry(self, request: Callable[[], Any]) -> Any:
+        """Run request, retrying transient failures with jittered exponential backoff."""
+        attempt = 0
+        while True:
+            try:
+                return request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+    
+    async def _awith_retry(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of _with_retry."""
+        attempt = 0
+        while True:
+            try:
+                return await request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    def _cached_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        json_response: bool,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> Tuple[Optional[Tuple[str, Optional[str], Any]], Optional[str]]:
+        """
+        Look a completion up in the exact, then the semantic cache.
+        
+        Returns (ticket, cached_text). The ticket records where to store a
+        fresh response - (cache_key, partition, embedding) - and is None
+        for uncacheable calls.
+        """
+        if temperature != 0:
+            return None, None
+        
+        settings = self._cache_settings(system_prompt, temperature, max_tokens, json_response, schema)
+        cache_key = _ResponseCache.make_key(prompt=prompt, **settings)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self.logger.debug("LLM completion served from cache")
+            return (cache_key, None, None), cached
+        
+        disk_cache = self._get_disk_cache()
+        if disk_cache is not None:
+            cached = disk_cache.get(cache_key)
+            if cached is not None:
+                self.logger.debug("LLM completion served from disk cache")
+                self._response_cache.set(cache_key, cached)
+                return (cache_key, None, None), cached
+        
+        if self._semantic_cache is None:
+            return (cache_key, None, None), None
+        
+        embedding = self._embed(prompt)
+        if embedding is None:
+            return (cache_key, None, None), None
+        
+        partition = _ResponseCache.make_key(**settings)
+        cached = self._semantic_cache.get(partition, embedding)
+        if cached is not None:
+            self.logger.debug("LLM completion served from semantic cache")
+            self._response_cache.set(cache_key, cached)
+        return (cache_key, partition, embedding), cached
+    
+    def _cache_settings(
+        self,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        json_response: bool,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> Dict[str, Any]:
+        """Every request parameter except the prompt that shapes a completion."""
+        settings = dict(
+            model=self.model,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            json_response=json_response,
+        )
+        if schema is not None:
+            settings["schema"] = schema.model_json_schema()
+        return settings
+    
+    def _discard_cached(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        json_response: bool
+    ):
+        """Drop a cached completion that turned out to be unusable."""
+        if temperature != 0:
+            return
+        settings = self._cache_settings(system_prompt, temperature, max_tokens, json_response)
+        cache_key = _ResponseCache.make_key(prompt=prompt, **settings)
+        self._response_cache.discard(cache_key)
+        if self._disk_cache is not None:
+            self._disk_cache.delete(cache_key)
+    
+    def _get_disk_cache(self) -> Optional[DiskCache]:
+        if self._disk_cache is None and config.llm_disk_cache:
+            try:
+                self._disk_cache = DiskCache(config.cache_dir / "llm.sqlite", ttl=config.llm_disk_cache_ttl)
+            except Exception as e:
+                self.logger.warning("LLM disk cache unavailable: %s", e)
+        return self._disk_cache
+    
+    def _embed(self, text: str):
+        """Unit-normalized embedding of text, or None if the request fails."""
+        try:
+            response = self.client.embeddings.create(model=self.EMBEDDING_MODEL, input=text)
+        except Exception as e:
+            self.logger.debug("Prompt embedding failed: %s", e)
+            return None
+        
+        embedding = np.asarray(response.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else None
+    
+    def _completion_kwargs(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        json_response: bool
+    ) -> Dict[str, Any]:
+        """
+        Build chat.completions.create arguments.
+        
+        The system prompt always goes first and must not contain per-call
+        data: OpenAI caches the longest stable prefix of a request, so any
+        dynamic content belongs in the user prompt after it.
+        """
         messages = []
         
         if system_prompt:
@@ -72,24 +676,81 @@ class LLMClient:
         
         messages.append({"role": "user", "content": prompt})
         
-        try:
-            kwargs = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-            }
-            
-            if json_response:
-                kwargs["response_format"] = {"type": "json_object"}
-            
-            response = self.client.chat.completions.create(**kwargs)
-            
-            return response.choices[0].message.content
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
         
-        except Exception as e:
-            self.logger.error(f"LLM completion failed: {e}")
-            return None
+        if json_response:
+            kwargs["response_format"] = {"type": "json_object"}
+        
+        if system_prompt and len(system_prompt) >= self.PREFIX_CACHE_MIN_CHARS:
+            # Route requests sharing this system prompt to the same cache
+            kwargs["extra_body"] = {"prompt_cache_key": _system_prompt_key(system_prompt)}
+        
+        return kwargs
+    
+    def _estimate_tokens(self, messages: List[Dict[str, Any]], max_tokens: int) -> int:
+        """Rough token cost of a request (~4 chars per token) for the TPM budget."""
+        chars = 0
+        images = 0
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                chars += len(content)
+                continue
+            for part in content:
+                if part["type"] == "text":
+                    chars += len(part["text"])
+                else:
+                    images += 1
+        return chars // 4 + images * self.IMAGE_TOKEN_ESTIMATE + max_tokens
+    
+    @staticmethod
+    def _reconcile_tokens(estimate: int, response):
+        """Settle the TPM budget against the tokens the request really used."""
+        usage = getattr(response, "usage", None)
+        limiter = rate_limiters.get("openai")
+        if usage is not None and limiter is not None:
+            limiter.reconcile(estimate, usage.total_tokens)
+    
+    def _completion_result(self, ticket, response, json_response: bool = False) -> Optional[str]:
+        choice = response.choices[0]
+        text = choice.message.content
+        
+        details = getattr(response.usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        if cached_tokens:
+            self.logger.debug("Prompt prefix cache hit: %s/%s tokens", cached_tokens, response.usage.prompt_tokens)
+        
+        if ticket is not None and text is not None and self._is_cacheable(choice, text, json_response):
+            cache_key, partition, embedding = ticket
+            self._response_cache.set(cache_key, text)
+            if self._disk_cache is not None:
+                self._disk_cache.set(cache_key, text)
+            if partition is not None:
+                self._semantic_cache.set(partition, embedding, text)
+        
+        return text
+    
+    @staticmethod
+    def _is_cacheable(choice, text: str, json_response: bool) -> bool:
+        """
+        Whether a completion is worth replaying from cache.
+        
+        Truncated output (finish_reason "length") or JSON-mode text that does
+        not parse would otherwise be served again on every retry.
+        """
+        if choice.finish_reason != "stop":
+            return False
+        if json_response:
+            try:
+                _parse_json_text(text)
+            except ValueError:
+                return False
+        return True
     
     def complete_with_images(
         self,
@@ -115,6 +776,70 @@ class LLMClient:
         if not self.client:
             return None
         
+        messages = self._vision_messages(prompt, image_paths, system_prompt)
+        estimate = self._estimate_tokens(messages, max_tokens)
+        
+        try:
+            if not rate_limiters.acquire("openai", weight=estimate):
+                self.logger.warning("OpenAI rate limit wait timed out; request not sent")
+                return None
+            response = self._with_retry(lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            ))
+            self._reconcile_tokens(estimate, response)
+            
+            return response.choices[0].message.content
+        
+        except Exception as e:
+            self.logger.exception("Vision completion failed: %s", e)
+            return None
+    
+    async def acomplete_with_images(
+        self,
+        prompt: str,
+        image_paths: List[Path],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: int = 2000
+    ) -> Optional[str]:
+        """Async version of complete_with_images."""
+        if not self.aclient:
+            return None
+        
+        # Image files are read and encoded off the event loop
+        messages = await asyncio.to_thread(
+            self._vision_messages, prompt, image_paths, system_prompt
+        )
+        
+        estimate = self._estimate_tokens(messages, max_tokens)
+        
+        try:
+            if not await rate_limiters.aacquire("openai", weight=estimate):
+                self.logger.warning("OpenAI rate limit wait timed out; request not sent")
+                return None
+            response = await self._awith_retry(lambda: self.aclient.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            ))
+            self._reconcile_tokens(estimate, response)
+            
+            return response.choices[0].message.content
+        
+        except Exception as e:
+            self.logger.exception("Vision completion failed: %s", e)
+            return None
+    
+    @staticmethod
+    def _vision_messages(
+        prompt: str,
+        image_paths: List[Path],
+        system_prompt: Optional[str]
+    ) -> List[Dict[str, Any]]:
         messages = []
         
         if system_prompt:
@@ -125,8 +850,7 @@ class LLMClient:
         
         for image_path in image_paths:
             if image_path.exists():
-                with open(image_path, "rb") as f:
-                    image_data = base64.b64encode(f.read()).decode()
+                image_data = _encode_image(image_path)
                 
                 content.append({
                     "type": "image_url",
@@ -136,26 +860,14 @@ class LLMClient:
                 })
         
         messages.append({"role": "user", "content": content})
-        
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-            
-            return response.choices[0].message.content
-        
-        except Exception as e:
-            self.logger.error(f"Vision completion failed: {e}")
-            return None
+        return messages
     
     def complete_json(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        schema: Optional[Type[BaseModel]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Get JSON completion from LLM.
@@ -164,14 +876,35 @@ class LLMClient:
             prompt: User prompt
             system_prompt: Optional system prompt
             temperature: Response randomness
+            schema: Optional pydantic model the response must conform to.
+                On models with structured outputs the server enforces it;
+                otherwise the plain JSON-mode path below is used.
         
         Returns:
             Parsed JSON dict or None if failed
         """
+        if schema is not None and self._supports_structured_outputs():
+            return self._complete_structured(prompt, system_prompt, temperature, schema)
+        
+        return self._complete_json_mode(prompt, system_prompt, temperature)
+    
+    def _supports_structured_outputs(self) -> bool:
+        if self.model in self.STRUCTURED_OUTPUT_EXCLUDED:
+            return False
+        return _SNAPSHOT_RE.sub("", self.model) in self.STRUCTURED_OUTPUT_MODELS
+    
+    def _complete_json_mode(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float
+    ) -> Optional[Dict[str, Any]]:
+        """complete_json via JSON mode: the response is parsed, not validated."""
         response = self.complete(
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=temperature,
+            max_tokens=self.JSON_MAX_TOKENS,
             json_response=True
         )
         
@@ -180,18 +913,58 @@ class LLMClient:
         
         try:
             # Clean response (remove markdown code blocks if present)
-            cleaned = response.strip()
-            if cleaned.startswith("```json"):
-                cleaned = cleaned[7:]
-            if cleaned.startswith("```"):
-                cleaned = cleaned[3:]
-            if cleaned.endswith("```"):
-                cleaned = cleaned[:-3]
-            
-            return json.loads(cleaned.strip())
+            return _parse_json_text(response)
         except json.JSONDecodeError as e:
-            self.logger.error(f"Failed to parse JSON response: {e}")
-            self.logger.debug(f"Response was: {response}")
+            self.logger.error("Failed to parse JSON response: %s", e)
+            self.logger.debug("Response was: %s", response)
+            # Never replay unparseable text; a retry must reach the API
+            self._discard_cached(prompt, system_prompt, temperature, self.JSON_MAX_TOKENS, True)
+            return None
+    
+    def _complete_structured(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        schema: Type[BaseModel]
+    ) -> Optional[Dict[str, Any]]:
+        """complete_json via structured outputs: valid, schema-conforming JSON guaranteed."""
+        if not self.client:
+            return None
+        
+        max_tokens = self.JSON_MAX_TOKENS
+        ticket, cached = self._cached_completion(
+            prompt, system_prompt, temperature, max_tokens, True, schema
+        )
+        if cached is not None:
+            return _json_loads(cached)
+        
+        kwargs = self._completion_kwargs(prompt, system_prompt, temperature, max_tokens, False)
+        estimate = self._estimate_tokens(kwargs["messages"], max_tokens)
+        
+        try:
+            if not rate_limiters.acquire("openai", weight=estimate):
+                self.logger.warning("OpenAI rate limit wait timed out; request not sent")
+                return None
+            response = self._with_retry(lambda: self.client.beta.chat.completions.parse(
+                response_format=schema, **kwargs
+            ))
+            self._reconcile_tokens(estimate, response)
+            
+            parsed = response.choices[0].message.parsed
+            if parsed is None:
+                self.logger.warning("Structured completion refused: %s", response.choices[0].message.refusal)
+                return None
+            
+            self._completion_result(ticket, response)
+            return parsed.model_dump()
+        
+        except Exception as e:
+            if BadRequestError is not None and isinstance(e, BadRequestError):
+                # The model or this schema is not accepted for structured outputs
+                self.logger.warning("Structured outputs rejected, using JSON mode: %s", e)
+                return self._complete_json_mode(prompt, system_prompt, temperature)
+            self.logger.exception("Structured completion failed: %s", e)
             return None
     
     def transcribe_audio(
@@ -215,54 +988,118 @@ class LLMClient:
             return None
         
         model = config.whisper_model
-        self.logger.info(f"Transcribing with model: {model}")
+        self.logger.info("Transcribing with model: %s", model)
         
         try:
             with open(audio_path, "rb") as f:
-                # Different API call based on model
-                if model == "gpt-4o-transcribe":
-                    # gpt-4o-transcribe API
-                    response = self.client.audio.transcriptions.create(
-                        model=model,
-                        file=f,
+                def transcribe():
+                    # Each attempt re-sends the file from the start
+                    f.seek(0)
+                    return self.client.audio.transcriptions.create(
+                        model=model, file=f, **self._transcription_params(model, language)
                     )
-                    
-                    # gpt-4o-transcribe returns simpler response
-                    return {
-                        "text": response.text if hasattr(response, 'text') else str(response),
-                        "segments": [],  # May not have segments
-                        "language": language,
-                        "duration": None
-                    }
-                else:
-                    # whisper-1 API with verbose response
-                    response = self.client.audio.transcriptions.create(
-                        model=model,
-                        file=f,
-                        language=language,
-                        response_format="verbose_json",
-                        timestamp_granularities=["segment"]
-                    )
-                    
-                    return {
-                        "text": response.text,
-                        "segments": [
-                            {
-                                "start": s.start,
-                                "end": s.end,
-                                "text": s.text
-                            }
-                            for s in (response.segments or [])
-                        ],
-                        "language": response.language,
-                        "duration": response.duration
-                    }
+                
+                response = self._with_retry(transcribe)
+                return self._transcription_result(model, response, language)
         
         except Exception as e:
-            self.logger.error(f"Audio transcription failed: {e}")
-            import traceback
-            traceback.print_exc()
+            self.logger.exception("Audio transcription failed: %s", e)
+            return None
+    
+    async def atranscribe_audio(
+        self,
+        audio_path: Path,
+        language: str = "en",
+        chunk_seconds: float = 540.0
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Transcribe a long recording as concurrent chunks.
+        
+        WAV files longer than chunk_seconds are cut into fixed-length
+        chunks that are transcribed in parallel and stitched back together,
+        with segment times shifted to the full recording. Anything else is
+        transcribed in one request.
+        """
+        if not self.aclient:
             return None
+        
+        chunks = await asyncio.to_thread(_split_wav, audio_path, chunk_seconds)
+        if not chunks or len(chunks) == 1:
+            return await asyncio.to_thread(self.transcribe_audio, audio_path, language)
+        
+        model = config.whisper_model
+        self.logger.info("Transcribing %s chunks with model: %s", len(chunks), model)
+        
+        async def transcribe_chunk(index: int, data: bytes) -> Dict[str, Any]:
+            if not await rate_limiters.aacquire("openai"):
+                raise TimeoutError("OpenAI rate limit wait timed out; request not sent")
+            response = await self._awith_retry(lambda: self.aclient.audio.transcriptions.create(
+                model=model,
+                file=(f"chunk_{index}.wav", data),
+                **self._transcription_params(model, language)
+            ))
+            return self._transcription_result(model, response, language)
+        
+        try:
+            parts = await asyncio.gather(*(transcribe_chunk(i, c) for i, c in enumerate(chunks)))
+        except Exception as e:
+            self.logger.exception("Audio transcription failed: %s", e)
+            return None
+        
+        segments = []
+        for index, part in enumerate(parts):
+            offset = index * chunk_seconds
+            segments.extend(
+                {"start": seg["start"] + offset, "end": seg["end"] + offset, "text": seg["text"]}
+                for seg in part["segments"]
+            )
+        
+        durations = [part["duration"] for part in parts]
+        return {
+            "text": " ".join(part["text"].strip() for part in parts if part["text"]),
+            "segments": segments,
+            "language": parts[0]["language"],
+            "duration": sum(durations) if None not in durations else None
+        }
+    
+    @staticmethod
+    def _transcription_params(model: str, language: str) -> Dict[str, Any]:
+        """Model-specific transcription request options."""
+        if model == "gpt-4o-transcribe":
+            # gpt-4o-transcribe API
+            return {}
+        
+        # whisper-1 API with verbose response
+        return {
+            "language": language,
+            "response_format": "verbose_json",
+            "timestamp_granularities": ["segment"],
+        }
+    
+    @staticmethod
+    def _transcription_result(model: str, response, language: str) -> Dict[str, Any]:
+        if model == "gpt-4o-transcribe":
+            # gpt-4o-transcribe returns simpler response
+            return {
+                "text": response.text if hasattr(response, 'text') else str(response),
+                "segments": [],  # May not have segments
+                "language": language,
+                "duration": None
+            }
+        
+        return {
+            "text": response.text,
+            "segments": [
+                {
+                    "start": s.start,
+                    "end": s.end,
+                    "text": s.text
+                }
+                for s in (response.segments or [])
+            ],
+            "language": response.language,
+            "duration": response.duration
+        }
 
 
 # Global LLM client instance
@@ -1,9 +1,9 @@
 """Logging utilities for PbD system."""
 import logging
 import sys
+import time
 from typing import Optional
 from pathlib import Path
-from datetime import datetime
 
 
 class ColoredFormatter(logging.Formatter):
@@ -19,9 +19,11 @@ class ColoredFormatter(logging.Formatter):
     RESET = '\033[0m'
     
     def format(self, record):
+        # Color a copy: the record is shared with every other handler
         color = self.COLORS.get(record.levelname, self.RESET)
-        record.levelname = f"{color}{record.levelname}{self.RESET}"
-        return super().format(record)
+        colored = logging.makeLogRecord(record.__dict__)
+        colored.levelname = f"{color}{record.levelname}{self.RESET}"
+        return super().format(colored)
 
 
 def setup_logger(
@@ -75,6 +77,22 @@ def setup_logger(
     return logger
 
 
+class NamedLoggerAdapter(logging.LoggerAdapter):
+    """
+    Tags messages with an instance name on a shared logger.
+    
+    Lets many instances of one class (e.g. one rate limiter per API) log
+    through a single configured logger instead of each setting up its own
+    handlers.
+    """
+    
+    def __init__(self, logger: logging.Logger, name: str):
+        super().__init__(logger, {"instance": name})
+    
+    def process(self, msg, kwargs):
+        return f"[{self.extra['instance']}] {msg}", kwargs
+
+
 class StepLogger:
     """Context manager for logging step execution with timing."""
     
@@ -83,18 +101,20 @@ class StepLogger:
         self.step_name = step_name
         self.step_num = step_num
         self.start_time = None
+        self._prefix = None
     
     def __enter__(self):
-        self.start_time = datetime.now()
-        self.logger.info(f"[Step {self.step_num}] Starting: {self.step_name}")
+        self._prefix = f"[Step {self.step_num}]"
+        self.start_time = time.perf_counter()
+        self.logger.info("%s Starting: %s", self._prefix, self.step_name)
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        duration = (datetime.now() - self.start_time).total_seconds()
+        duration = time.perf_counter() - self.start_time
         
         if exc_type:
-            self.logger.error(f"[Step {self.step_num}] Failed: {self.step_name} ({duration:.2f}s) - {exc_val}")
+            self.logger.error("%s Failed: %s (%.2fs) - %s", self._prefix, self.step_name, duration, exc_val)
         else:
-            self.logger.info(f"[Step {self.step_num}] Completed: {self.step_name} ({duration:.2f}s)")
+            self.logger.info("%s Completed: %s (%.2fs)", self._prefix, self.step_name, duration)
         
         return False  # Don't suppress exceptions
\ No newline at end of file
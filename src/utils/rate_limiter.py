@@ -3,14 +3,19 @@
 Prevents hitting rate limits on external APIs (OpenAI, Gemini, etc.)
 by throttling requests when approaching limits.
 """
+import asyncio
 import time
-from collections import deque
 from threading import Lock
 from typing import Optional, Dict
 from dataclasses import dataclass
 from functools import wraps
 
-from src.utils.logger import setup_logger
+from src.utils.logger import setup_logger, NamedLoggerAdapter
+
+
+# Shared by every limiter/bucket; each instance tags messages with its name
+_LIMITER_LOG = setup_logger("RateLimiter")
+_BUCKET_LOG = setup_logger("TokenBucket")
 
 
 @dataclass
@@ -19,14 +24,16 @@ class RateLimitConfig:
     calls_per_minute: int = 60
     calls_per_hour: int = 1000
     min_interval_seconds: float = 0.0  # Minimum time between calls
+    tokens_per_minute: int = 0  # Weighted (e.g. LLM token) budget; 0 = disabled
 
 
 class RateLimiter:
     """
-    Thread-safe rate limiter using sliding window algorithm.
+    Thread-safe rate limiter using per-minute and per-hour token buckets.
     
     Features:
     - Per-minute and per-hour limits
+    - Optional tokens-per-minute budget for weighted calls
     - Minimum interval between calls
     - Automatic waiting when limit reached
     - Statistics tracking
@@ -38,6 +45,12 @@ class RateLimiter:
         limiter.acquire()  # Will wait if rate limit reached
         api_call()
         
+        # With a token budget, weight each call by its estimated tokens:
+        limiter = RateLimiter(calls_per_minute=60, tokens_per_minute=30_000)
+        limiter.acquire(weight=estimated_tokens)
+        response = api_call()
+        limiter.reconcile(estimated_tokens, response.usage.total_tokens)
+        
         # Or use as decorator:
         @limiter.limit
         def api_call():
@@ -49,7 +62,8 @@ class RateLimiter:
         calls_per_minute: int = 60,
         calls_per_hour: int = 1000,
         min_interval_seconds: float = 0.0,
-        name: str = "default"
+        name: str = "default",
+        tokens_per_minute: int = 0
     ):
         """
         Initialize rate limiter.
@@ -59,14 +73,19 @@ class RateLimiter:
             calls_per_hour: Maximum calls allowed per hour
             min_interval_seconds: Minimum seconds between consecutive calls
             name: Name for logging purposes
+            tokens_per_minute: Budget consumed by call weights (0 = disabled)
         """
         self.name = name
         self.calls_per_minute = calls_per_minute
         self.calls_per_hour = calls_per_hour
         self.min_interval_seconds = min_interval_seconds
+        self.tokens_per_minute = tokens_per_minute
         
-        self._minute_window = deque()  # Timestamps of calls in last minute
-        self._hour_window = deque()    # Timestamps of calls in last hour
+        # Token buckets, refilled continuously up to their per-window capacity
+        self._minute_tokens = float(calls_per_minute)
+        self._hour_tokens = float(calls_per_hour)
+        self._tpm_tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
         self._last_call: Optional[float] = None
         self._lock = Lock()
         
@@ -75,85 +94,150 @@ class RateLimiter:
         self._total_wait_time = 0.0
         self._times_throttled = 0
         
-        self.logger = setup_logger(f"RateLimiter:{name}")
+        self.logger = NamedLoggerAdapter(_LIMITER_LOG, name)
     
-    def acquire(self, timeout: float = 60.0) -> bool:
+    def acquire(self, timeout: float = 60.0, weight: int = 1) -> bool:
         """
         Acquire permission to make an API call.
         
         Blocks until the rate limit allows a call, or timeout is reached.
+        Use aacquire from async code; acquire blocks the event loop.
         
         Args:
             timeout: Maximum time to wait in seconds
+            weight: Amount taken from the tokens-per-minute budget
         
         Returns:
             True if acquired, False if timeout reached
         """
-        start_wait = time.time()
+        start_wait = time.monotonic()
         
         while True:
-            wait_time = self._calculate_wait_time()
+            wait_time = self._poll(weight, start_wait, timeout)
             
-            if wait_time <= 0:
-                # Can proceed immediately
-                self._record_call()
+            if wait_time == 0:
+                # Acquired
                 return True
             
-            # Check timeout
-            elapsed = time.time() - start_wait
-            if elapsed + wait_time > timeout:
-                self.logger.warning(f"Rate limit timeout after {elapsed:.2f}s")
+            if wait_time is None:
+                self.logger.warning("Rate limit timeout after %.2fs", time.monotonic() - start_wait)
                 return False
             
             # Wait and retry
-            self.logger.debug(f"Rate limited, waiting {wait_time:.2f}s")
-            self._times_throttled += 1
-            self._total_wait_time += wait_time
+            self.logger.debug("Rate limited, waiting %.2fs", wait_time)
             time.sleep(wait_time)
     
-    def _calculate_wait_time(self) -> float:
-        """Calculate how long to wait before next call is allowed."""
-        with self._lock:
-            now = time.time()
-            wait_times = []
-            
-            # Clean old entries and check per-minute limit
-            minute_ago = now - 60.0
-            while self._minute_window and self._minute_window[0] < minute_ago:
-                self._minute_window.popleft()
-            
-            if len(self._minute_window) >= self.calls_per_minute:
-                # Need to wait until oldest call falls out of window
-                oldest = self._minute_window[0]
-                wait_times.append(oldest - minute_ago)
-            
-            # Clean old entries and check per-hour limit
-            hour_ago = now - 3600.0
-            while self._hour_window and self._hour_window[0] < hour_ago:
-                self._hour_window.popleft()
+    async def aacquire(self, timeout: float = 60.0, weight: int = 1) -> bool:
+        """
+        Async version of acquire.
+        
+        Waits with asyncio.sleep, so other coroutines keep running while
+        this one is throttled.
+        
+        Args:
+            timeout: Maximum time to wait in seconds
+            weight: Amount taken from the tokens-per-minute budget
+        
+        Returns:
+            True if acquired, False if timeout reached
+        """
+        start_wait = time.monotonic()
+        
+        while True:
+            wait_time = self._poll(weight, start_wait, timeout)
             
-            if len(self._hour_window) >= self.calls_per_hour:
-                oldest = self._hour_window[0]
-                wait_times.append(oldest - hour_ago)
+            if wait_time == 0:
+                return True
             
-            # Check minimum interval
-            if self._last_call and self.min_interval_seconds > 0:
-                time_since_last = now - self._last_call
-                if time_since_last < self.min_interval_seconds:
-                    wait_times.append(self.min_interval_seconds - time_since_last)
+            if wait_time is None:
+                self.logger.warning("Rate limit timeout after %.2fs", time.monotonic() - start_wait)
+                return False
             
-            return max(wait_times) if wait_times else 0.0
+            self.logger.debug("Rate limited, waiting %.2fs", wait_time)
+            await asyncio.sleep(wait_time)
     
-    def _record_call(self):
-        """Record that a call was made."""
+    def _poll(self, weight: int, start_wait: float, timeout: float) -> Optional[float]:
+        """
+        One acquire attempt, in a single critical section.
+        
+        Returns 0 if the call was recorded, the seconds to wait before
+        trying again, or None if that wait would exceed the timeout.
+        """
         with self._lock:
-            now = time.time()
-            self._minute_window.append(now)
-            self._hour_window.append(now)
-            self._last_call = now
-            self._total_calls += 1
+            now = time.monotonic()
+            wait_time = self._try_acquire_locked(now, weight)
+            if wait_time <= 0:
+                return 0.0
+            if now - start_wait + wait_time > timeout:
+                return None
+            self._times_throttled += 1
+            self._total_wait_time += wait_time
+            return wait_time
     
-    def try_acquire(self) -> bool:
+    def _refill(self, now: float):
+        """Top up all buckets for the time elapsed since the last refill (lock held)."""
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._minute_tokens = min(
+                self.calls_per_minute,
+                self._minute_tokens + elapsed * self.calls_per_minute / 60.0
+            )
+            self._hour_tokens = min(
+                self.calls_per_hour,
+                self._hour_tokens + elapsed * self.calls_per_hour / 3600.0
+            )
+            if self.tokens_per_minute:
+                self._tpm_tokens = min(
+                    self.tokens_per_minute,
+                    self._tpm_tokens + elapsed * self.tokens_per_minute / 60.0
+                )
+        self._last_refill = now
+    
+    def _try_acquire_locked(self, now: float, weight: int) -> float:
+        """
+        Check the limits and, if they allow it, record a call (lock held).
+        
+        Checking and recording under one lock acquisition means two threads
+        can never both pass the check for the last available slot.
+        
+        Returns:
+            0 if the call was recorded, else seconds until it would be allowed
+        """
+        wait_times = []
+        self._refill(now)
+        
+        # Per-minute limit: wait until a whole token has refilled
+        if self._minute_tokens < 1:
+            wait_times.append((1 - self._minute_tokens) * 60.0 / self.calls_per_minute)
+        
+        # Per-hour limit
+        if self._hour_tokens < 1:
+            wait_times.append((1 - self._hour_tokens) * 3600.0 / self.calls_per_hour)
+        
+        # Tokens-per-minute budget; a weight above capacity can never fit, so cap it
+        needed = min(weight, self.tokens_per_minute)
+        if self.tokens_per_minute and self._tpm_tokens < needed:
+            wait_times.append((needed - self._tpm_tokens) * 60.0 / self.tokens_per_minute)
+        
+        # Check minimum interval
+        if self._last_call and self.min_interval_seconds > 0:
+            time_since_last = now - self._last_call
+            if time_since_last < self.min_interval_seconds:
+                wait_times.append(self.min_interval_seconds - time_since_last)
+        
+        if wait_times:
+            return max(wait_times)
+        
+        # Record the call
+        self._minute_tokens -= 1
+        self._hour_tokens -= 1
+        if self.tokens_per_minute:
+            self._tpm_tokens -= needed
+        self._last_call = now
+        self._total_calls += 1
+        return 0.0
+    
+    def try_acquire(self, weight: int = 1) -> bool:
         """
         Try to acquire permission without waiting.
         
@@ -161,10 +245,22 @@ class RateLimiter:
             True if acquired, False if would need to wait
         """
         with self._lock:
-            if self._calculate_wait_time() <= 0:
-                self._record_call()
-                return True
-            return False
+            return self._try_acquire_locked(time.monotonic(), weight) <= 0
+    
+    def reconcile(self, estimated: int, actual: int):
+        """
+        Correct the token budget once a call's real usage is known.
+        
+        Refunds over-estimates and charges under-estimates, so later
+        acquires see the budget that was actually consumed.
+        """
+        if not self.tokens_per_minute or actual is None:
+            return
+        with self._lock:
+            self._tpm_tokens = min(
+                self.tokens_per_minute,
+                self._tpm_tokens + min(estimated, self.tokens_per_minute) - actual
+            )
     
     def limit(self, func):
         """
@@ -184,16 +280,20 @@ class RateLimiter:
     def get_stats(self) -> Dict:
         """Get rate limiter statistics."""
         with self._lock:
+            self._refill(time.monotonic())
             return {
                 "name": self.name,
                 "total_calls": self._total_calls,
                 "times_throttled": self._times_throttled,
                 "total_wait_time_seconds": round(self._total_wait_time, 2),
-                "calls_in_last_minute": len(self._minute_window),
-                "calls_in_last_hour": len(self._hour_window),
+                # Approximate: budget consumed and not yet refilled
+                "calls_in_last_minute": round(self.calls_per_minute - self._minute_tokens),
+                "calls_in_last_hour": round(self.calls_per_hour - self._hour_tokens),
+                "tokens_in_last_minute": round(self.tokens_per_minute - self._tpm_tokens),
                 "limits": {
                     "per_minute": self.calls_per_minute,
                     "per_hour": self.calls_per_hour,
+                    "tokens_per_minute": self.tokens_per_minute,
                     "min_interval": self.min_interval_seconds
                 }
             }
@@ -201,14 +301,99 @@ class RateLimiter:
     def reset(self):
         """Reset the rate limiter state and statistics."""
         with self._lock:
-            self._minute_window.clear()
-            self._hour_window.clear()
+            self._minute_tokens = float(self.calls_per_minute)
+            self._hour_tokens = float(self.calls_per_hour)
+            self._tpm_tokens = float(self.tokens_per_minute)
+            self._last_refill = time.monotonic()
             self._last_call = None
             self._total_calls = 0
             self._total_wait_time = 0.0
             self._times_throttled = 0
 
 
+class TokenBucket:
+    """
+    Thread-safe token bucket for weighted budgets (e.g. tokens per minute).
+    
+    Unlike RateLimiter, which counts calls, each reservation takes an
+    arbitrary amount - typically an estimate of the tokens a request will
+    consume. The bucket refills continuously at capacity / per_seconds.
+    
+    Usage:
+        tpm = TokenBucket(capacity=1_000_000, per_seconds=60.0, name="tpm")
+        tpm.reserve(estimated_tokens)  # Will wait until budget is available
+        api_call()
+    """
+    
+    def __init__(self, capacity: float, per_seconds: float = 60.0, name: str = "bucket"):
+        self.name = name
+        self.capacity = float(capacity)
+        self.refill_rate = self.capacity / per_seconds
+        
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = Lock()
+        
+        self.logger = NamedLoggerAdapter(_BUCKET_LOG, name)
+    
+    def _try_take(self, amount: float) -> float:
+        """Take amount if available; otherwise return seconds until it will be."""
+        # A request larger than the whole bucket can never fit - cap it
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+            self._last_refill = now
+            
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.refill_rate
+    
+    def reserve(self, amount: float, timeout: float = 60.0) -> bool:
+        """
+        Block until amount can be taken from the bucket.
+        
+        Returns:
+            True if reserved, False if timeout reached
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            wait_time = self._try_take(amount)
+            if wait_time <= 0:
+                return True
+            if time.monotonic() + wait_time > deadline:
+                self.logger.warning("Token budget timeout reserving %.0f", amount)
+                return False
+            self.logger.debug("Token budget exhausted, waiting %.2fs", wait_time)
+            time.sleep(wait_time)
+    
+    async def areserve(self, amount: float, timeout: float = 60.0) -> bool:
+        """Async version of reserve; waits without blocking the event loop."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait_time = self._try_take(amount)
+            if wait_time <= 0:
+                return True
+            if time.monotonic() + wait_time > deadline:
+                self.logger.warning("Token budget timeout reserving %.0f", amount)
+                return False
+            self.logger.debug("Token budget exhausted, waiting %.2fs", wait_time)
+            await asyncio.sleep(wait_time)
+    
+    def refund(self, amount: float):
+        """Return unused budget, e.g. when actual usage came in under the estimate."""
+        if amount <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+    
+    @property
+    def available(self) -> float:
+        with self._lock:
+            return min(self.capacity, self._tokens + (time.monotonic() - self._last_refill) * self.refill_rate)
+
+
 class RateLimiterManager:
     """
     Manager for multiple rate limiters.
@@ -234,7 +419,8 @@ class RateLimiterManager:
         name: str,
         calls_per_minute: int = 60,
         calls_per_hour: int = 1000,
-        min_interval_seconds: float = 0.0
+        min_interval_seconds: float = 0.0,
+        tokens_per_minute: int = 0
     ) -> RateLimiter:
         """
         Register a new rate limiter.
@@ -244,45 +430,57 @@ class RateLimiterManager:
             calls_per_minute: Max calls per minute
             calls_per_hour: Max calls per hour
             min_interval_seconds: Min seconds between calls
+            tokens_per_minute: Weighted budget per minute (0 = disabled)
         
         Returns:
             The created RateLimiter
         """
         with self._lock:
             if name in self._limiters:
-                self.logger.warning(f"Replacing existing limiter: {name}")
+                self.logger.warning("Replacing existing limiter: %s", name)
             
             limiter = RateLimiter(
                 calls_per_minute=calls_per_minute,
                 calls_per_hour=calls_per_hour,
                 min_interval_seconds=min_interval_seconds,
-                name=name
+                name=name,
+                tokens_per_minute=tokens_per_minute
             )
             self._limiters[name] = limiter
-            self.logger.info(f"Registered rate limiter: {name} ({calls_per_minute}/min)")
+            self.logger.info("Registered rate limiter: %s (%s/min)", name, calls_per_minute)
             return limiter
     
     def get(self, name: str) -> Optional[RateLimiter]:
         """Get a rate limiter by name."""
         return self._limiters.get(name)
     
-    def acquire(self, name: str, timeout: float = 60.0) -> bool:
+    def acquire(self, name: str, timeout: float = 60.0, weight: int = 1) -> bool:
         """
         Acquire permission from a named rate limiter.
         
         Args:
             name: Name of the rate limiter
             timeout: Maximum wait time
+            weight: Amount taken from the limiter's token budget
         
         Returns:
             True if acquired, False if limiter not found or timeout
         """
         limiter = self._limiters.get(name)
         if not limiter:
-            self.logger.warning(f"Unknown rate limiter: {name}")
+            self.logger.warning("Unknown rate limiter: %s", name)
+            return True  # Allow call if limiter not configured
+        
+        return limiter.acquire(timeout, weight)
+    
+    async def aacquire(self, name: str, timeout: float = 60.0, weight: int = 1) -> bool:
+        """Async version of acquire; use this from async code."""
+        limiter = self._limiters.get(name)
+        if not limiter:
+            self.logger.warning("Unknown rate limiter: %s", name)
             return True  # Allow call if limiter not configured
         
-        return limiter.acquire(timeout)
+        return await limiter.aacquire(timeout, weight)
     
     def get_all_stats(self) -> Dict[str, Dict]:
         """Get statistics from all rate limiters."""
@@ -298,5 +496,5 @@ rate_limiters = RateLimiterManager()
 # Register default limiters (conservative limits)
 # These can be overridden by calling register() again
 rate_limiters.register("gemini", calls_per_minute=30, min_interval_seconds=0.5)
-rate_limiters.register("openai", calls_per_minute=60, min_interval_seconds=0.1)
+rate_limiters.register("openai", calls_per_minute=60, min_interval_seconds=0.1, tokens_per_minute=30_000)
 rate_limiters.register("default", calls_per_minute=60)
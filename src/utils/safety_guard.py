@@ -7,30 +7,139 @@ operations during workflow execution, such as:
 - Dangerous terminal commands
 - Browser settings that could cause data loss
 """
+import hashlib
+import logging
+import os
 import re
-from typing import List, Tuple, Optional, Set
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional, Set
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
 
 from src.utils.logger import setup_logger
 
+# Optional: Hyperscan compiles all command patterns into one DFA
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+    hyperscan = None
 
-class DangerLevel(Enum):
-    """Severity level of detected danger."""
-    SAFE = "safe"
-    WARNING = "warning"
-    BLOCKED = "blocked"
+# Optional: Aho-Corasick literal prefilter for the regex fallback
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
 
 
-@dataclass
+def _required_literal(pattern: str) -> str:
+    """
+    Longest run of literal characters every match of pattern must contain.
+    
+    Only handles the simple concatenations used in BLOCKED_TYPE_PATTERNS:
+    escapes like \\s and character classes end a run, and a character
+    made optional by ?, * or {..} is dropped from it. Lowercased, since
+    the patterns are matched case-insensitively.
+    """
+    best, run = "", ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        literal = None
+        if c == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            literal = None if nxt.isalnum() else nxt  # \s, \d... are classes
+            i += 2
+        elif c == "[":
+            i = pattern.index("]", i + 1) + 1
+        elif c in ".^$()|":
+            i += 1
+        elif c in "?*{":
+            run = run[:-1]  # Previous character is optional
+            i = pattern.index("}", i) + 1 if c == "{" else i + 1
+        elif c == "+":
+            i += 1
+        else:
+            literal = c
+            i += 1
+        
+        if literal is None:
+            best, run = max(best, run, key=len), ""
+            continue
+        # A quantifier right after a literal is handled by the next pass
+        run += literal.lower()
+    
+    return max(best, run, key=len)
+
+
+# Prefix shared by start-anchored BLOCKED_TYPE_PATTERNS, and the command
+# word that follows it
+_ANCHOR = r"^\s*"
+_COMMAND_WORD = re.compile(r"[A-Za-z]*")
+
+# Literal scheme prefix of a BLOCKED_URL_PATTERNS rule
+_URL_SCHEME = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:(?://)?")
+
+# Distinct typed-command verdicts remembered per SafetyGuard
+_COMMAND_MEMO_SIZE = 1024
+
+# Typed text longer than this is literal-prefiltered before the regex scan
+_PREFILTER_MIN_LEN = 256
+
+
+# Bound once; check_file_operation resolves a path on every call
+_expanduser = os.path.expanduser
+_abspath = os.path.abspath
+
+# Apps where typed text is treated as shell input
+_TERMINAL_APPS = frozenset({
+    "Terminal", "iTerm", "iTerm2", "Hyper", "Alacritty",
+    "kitty", "Warp", "Tabby", "Terminus", "Console"
+})
+
+_TERMINAL_APPS_CF = frozenset(a.casefold() for a in _TERMINAL_APPS)
+_TERMINAL_MARKERS = ("terminal", "console", "shell")
+
+# File operations that are checked against PROTECTED_PATHS
+_DANGEROUS_OPS = frozenset({"delete", "remove", "rm", "trash", "unlink", "rmdir"})
+
+# Protected paths whose whole subtree is off-limits, vs. user folders
+# that are only protected themselves
+_SYSTEM_PATHS = frozenset({"/", "/System", "/Library", "/usr", "/bin", "/sbin", "/etc", "/var", "/private"})
+_USER_PATHS = frozenset({"~", "~/Library", "~/Documents", "~/Desktop", "~/Downloads"})
+
+
+@lru_cache(maxsize=256)
+def _normalize_keys(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Lowercase/strip key names; memoized since the same shortcuts recur."""
+    return tuple(k.lower().strip() for k in keys)
+
+
+class DangerLevel(IntEnum):
+    """Severity level of detected danger, ordered so levels compare as ints."""
+    SAFE = 0
+    WARNING = 1
+    BLOCKED = 2
+
+
+@dataclass(frozen=True, slots=True)
 class SafetyCheck:
-    """Result of a safety check."""
+    """Result of a safety check (immutable, so one instance can be shared)."""
     allowed: bool
     danger_level: DangerLevel
     reason: Optional[str] = None
     action_type: Optional[str] = None
 
 
+# Shared result for every check that passes
+_SAFE_CHECK = SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+
+
 class SafetyGuard:
     """
     Prevents execution of dangerous operations.
@@ -84,6 +193,9 @@ class SafetyGuard:
     }
     
     # === BLOCKED TYPED PATTERNS (Shell commands) ===
+    # Matched against the raw typed text. Whitespace is not collapsed first:
+    # rules such as "nvram\s+" and "cat\s+.+\.env" rely on seeing every
+    # space, tab and trailing newline exactly as typed.
     BLOCKED_TYPE_PATTERNS = [
         # Destructive file operations
         r"^\s*sudo\s+rm\s+-rf\s+/",              # sudo rm -rf /
@@ -197,16 +309,216 @@ class SafetyGuard:
         self.logger = setup_logger("SafetyGuard")
         self.strict_mode = strict_mode
         
-        # Pre-compile patterns for performance
-        self._blocked_type_patterns = [
-            re.compile(p, re.IGNORECASE) for p in self.BLOCKED_TYPE_PATTERNS
-        ]
-        self._blocked_url_patterns = [
-            re.compile(p, re.IGNORECASE) for p in self.BLOCKED_URL_PATTERNS
-        ]
+        # Pre-compile each pattern list into one alternation, so a check is
+        # a single regex scan instead of one search() call per pattern
+        self._blocked_url_union = self._compile_union(self.BLOCKED_URL_PATTERNS)
+        
+        # Typed-command rules anchored at the start of the text only need
+        # one match() attempt; the rest are searched for anywhere
+        self._blocked_type_anchored, self._blocked_type_floating = (
+            self._compile_type_matchers(self.BLOCKED_TYPE_PATTERNS)
+        )
+        
+        # Typed text is scanned with Hyperscan when available
+        self._hs_db = self._compile_hyperscan(self.BLOCKED_TYPE_PATTERNS) if HYPERSCAN_AVAILABLE else None
+        self._hs_local = threading.local()  # Scratch space is per thread
+        
+        # Otherwise an Aho-Corasick pass over each pattern's required literal
+        # rejects almost all text before any regex runs
+        self._literal_automaton = None
+        if self._hs_db is None and AHOCORASICK_AVAILABLE:
+            self._literal_automaton = self._build_literal_automaton(self.BLOCKED_TYPE_PATTERNS)
+            self._blocked_type_patterns = [
+                re.compile(p, re.IGNORECASE) for p in self.BLOCKED_TYPE_PATTERNS
+            ]
+        
+        # Verdicts for recurring commands/URLs are memoized per instance;
+        # the checks below still build results and log on every call.
+        # Typed text may be a password or token, so command verdicts are
+        # keyed by a keyed digest and the text itself is never retained.
+        self._scan_command = self._select_command_scanner()
+        self._command_memo_key = os.urandom(16)
+        self._command_verdicts: "OrderedDict[bytes, bool]" = OrderedDict()
+        self._command_verdicts_lock = threading.Lock()
+        self._url_blocked = lru_cache(maxsize=1024)(self._matches_blocked_url)
+        
+        # Every URL rule names a browser-internal scheme (chrome://, about:...);
+        # URLs mentioning none of them never reach the regex or the memo
+        schemes = {_URL_SCHEME.match(p) for p in self.BLOCKED_URL_PATTERNS}
+        self._url_schemes = (
+            tuple(sorted({m.group().lower() for m in schemes})) if all(schemes) else None
+        )
+        
+        # With only the union regex, long pastes are first checked for any
+        # pattern's required literal; most contain none and skip the scan
+        self._type_literals = None
+        if self._hs_db is None and self._literal_automaton is None:
+            literals = {_required_literal(p) for p in self.BLOCKED_TYPE_PATTERNS}
+            if all(literals):
+                self._type_literals = tuple(literals)
+        
+        # Sensitive-app keywords casefolded once; a description is folded once
+        # per check and tested with plain substring containment
+        self._app_action_keywords = {
+            app: tuple(k.casefold() for k in keywords)
+            for app, keywords in self.BLOCKED_APP_ACTIONS.items()
+        }
+        
+        # Both shortcut tables folded into one lookup: keys -> (level, action).
+        # BLOCKED entries go last so they win over any WARNING duplicate.
+        self._shortcut_rules = {
+            **{keys: (DangerLevel.WARNING, name) for keys, name in self.WARNING_SHORTCUTS.items()},
+            **{keys: (DangerLevel.BLOCKED, None) for keys in self.BLOCKED_SHORTCUTS},
+        }
+        
+        # PROTECTED_PATHS resolved once, in order: (as written, absolute)
+        self._protected_abs = tuple(
+            (p, _expanduser(p) if p.startswith("/") else _abspath(_expanduser(p)))
+            for p in self.PROTECTED_PATHS
+        )
+        # Fast pre-test: a path can only be blocked if it is a protected path
+        # itself or lies under a system path
+        self._protected_abs_set = frozenset(abs_p for _, abs_p in self._protected_abs)
+        self._protected_prefixes = tuple(
+            abs_p + "/" for p, abs_p in self._protected_abs if p in _SYSTEM_PATHS
+        )
         
         self.logger.info(f"SafetyGuard initialized (strict_mode={strict_mode})")
     
+    @staticmethod
+    def _compile_union(patterns: List[str]) -> "re.Pattern":
+        return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+    
+    @staticmethod
+    def _compile_type_matchers(patterns: List[str]) -> Tuple["re.Pattern", "re.Pattern"]:
+        """
+        Split patterns into a start-anchored and a floating alternation.
+        
+        Anchored rules lose their shared ``^\\s*`` and are grouped by leading
+        command word (sudo, rm, diskutil...), so each word is tested once
+        and the engine factors what its tails have in common.
+        """
+        by_command: Dict[str, List[str]] = {}
+        floating = []
+        for pattern in patterns:
+            if not pattern.startswith(_ANCHOR):
+                floating.append(pattern)
+                continue
+            body = pattern[len(_ANCHOR):]
+            command = _COMMAND_WORD.match(body).group()
+            by_command.setdefault(command, []).append(body[len(command):])
+        
+        anchored = "|".join(
+            f"{command}(?:{'|'.join(tails)})" for command, tails in by_command.items()
+        )
+        return (
+            re.compile(rf"\s*(?:{anchored})", re.IGNORECASE),
+            re.compile("|".join(f"(?:{p})" for p in floating), re.IGNORECASE),
+        )
+    
+    def _compile_hyperscan(self, patterns: List[str]):
+        """Compile patterns into a Hyperscan database, or None to use the regex."""
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[p.encode() for p in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(patterns),
+            )
+            return db
+        except Exception as e:
+            self.logger.warning(f"Hyperscan compile failed, using regex: {e}")
+            return None
+    
+    @staticmethod
+    def _build_literal_automaton(patterns: List[str]):
+        """Map each pattern's required literal to the indices of patterns needing it."""
+        by_literal = {}
+        for idx, pattern in enumerate(patterns):
+            by_literal.setdefault(_required_literal(pattern), []).append(idx)
+        
+        automaton = ahocorasick.Automaton()
+        for literal, indices in by_literal.items():
+            automaton.add_word(literal, tuple(indices))
+        automaton.make_automaton()
+        return automaton
+    
+    def _select_command_scanner(self):
+        """
+        Pick the fastest available BLOCKED_TYPE_PATTERNS matcher once.
+        
+        Each scanner takes the text and returns whether any rule matches;
+        resolving the choice here keeps backend checks off the per-call path.
+        """
+        if self._hs_db is not None:
+            return self._scan_hyperscan
+        if self._literal_automaton is not None:
+            return self._scan_literals
+        return self._scan_regex
+    
+    def _lacks_type_literals(self, text: str) -> bool:
+        """Whether text provably matches no BLOCKED_TYPE_PATTERNS rule."""
+        # ASCII only: lower() there agrees exactly with re.IGNORECASE
+        if self._type_literals is None or not text.isascii():
+            return False
+        lowered = text.lower()
+        return not any(literal in lowered for literal in self._type_literals)
+    
+    def _scan_regex(self, text: str) -> bool:
+        return (
+            self._blocked_type_anchored.match(text) is not None
+            or self._blocked_type_floating.search(text) is not None
+        )
+    
+    def _scan_literals(self, text: str) -> bool:
+        # Only patterns whose literal occurs in the text can match
+        return any(
+            self._blocked_type_patterns[idx].search(text)
+            for _, indices in self._literal_automaton.iter(text.lower())
+            for idx in indices
+        )
+    
+    def _scan_hyperscan(self, text: str) -> bool:
+        scratch = getattr(self._hs_local, "scratch", None)
+        if scratch is None:
+            scratch = self._hs_local.scratch = hyperscan.Scratch(self._hs_db)
+        
+        hits = []
+        
+        def on_match(pattern_id, start, end, flags, context):
+            hits.append(pattern_id)
+            return True  # One hit is enough - stop scanning
+        
+        try:
+            self._hs_db.scan(text.encode("utf-8"), match_event_handler=on_match, scratch=scratch)
+        except hyperscan.error:
+            # Raised when the handler halts the scan
+            if not hits:
+                raise
+        return bool(hits)
+    
+    def _command_blocked(self, text: str) -> bool:
+        """Memoized BLOCKED_TYPE_PATTERNS verdict for text."""
+        digest = hashlib.blake2b(
+            text.encode("utf-8", "surrogatepass"), digest_size=16, key=self._command_memo_key
+        ).digest()
+        with self._command_verdicts_lock:
+            verdict = self._command_verdicts.get(digest)
+            if verdict is not None:
+                self._command_verdicts.move_to_end(digest)
+                return verdict
+        
+        verdict = bool(self._scan_command(text))
+        with self._command_verdicts_lock:
+            self._command_verdicts[digest] = verdict
+            if len(self._command_verdicts) > _COMMAND_MEMO_SIZE:
+                self._command_verdicts.popitem(last=False)
+        return verdict
+    
+    def _matches_blocked_url(self, url: str) -> bool:
+        return self._blocked_url_union.search(url) is not None
+    
     def check_shortcut(self, keys: Tuple[str, ...]) -> SafetyCheck:
         """
         Check if a keyboard shortcut is safe to execute.
@@ -217,34 +529,40 @@ class SafetyGuard:
         Returns:
             SafetyCheck with allowed=False if dangerous
         """
-        # Normalize keys to lowercase
-        keys_normalized = tuple(k.lower().strip() for k in keys)
+        # Normalize keys to lowercase; unlisted shortcuts need one lookup
+        rule = self._shortcut_rules.get(_normalize_keys(tuple(keys)))
+        if rule is None:
+            return _SAFE_CHECK
+        
+        danger_level, action_name = rule
         
         # Check absolutely blocked shortcuts
-        if keys_normalized in self.BLOCKED_SHORTCUTS:
-            self.logger.warning(f"🛑 BLOCKED shortcut: {'+'.join(keys)}")
+        if danger_level is DangerLevel.BLOCKED:
+            combo = "+".join(keys)
+            self.logger.warning("🛑 BLOCKED shortcut: %s", combo)
             return SafetyCheck(
                 allowed=False,
                 danger_level=DangerLevel.BLOCKED,
-                reason=f"Dangerous shortcut blocked: {'+'.join(keys)}",
+                reason=f"Dangerous shortcut blocked: {combo}",
                 action_type="shortcut"
             )
         
-        # Check warning-level shortcuts
-        for warning_keys, action_name in self.WARNING_SHORTCUTS.items():
-            if keys_normalized == warning_keys:
-                if self.strict_mode:
-                    self.logger.warning(f"⚠️ BLOCKED shortcut (strict): {'+'.join(keys)} ({action_name})")
-                    return SafetyCheck(
-                        allowed=False,
-                        danger_level=DangerLevel.WARNING,
-                        reason=f"Potentially dangerous shortcut ({action_name}): {'+'.join(keys)}",
-                        action_type="shortcut"
-                    )
-                else:
-                    self.logger.debug(f"⚠️ Allowing warning shortcut: {'+'.join(keys)} ({action_name})")
-        
-        return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+        # Warning-level shortcut
+        if self.strict_mode:
+            combo = "+".join(keys)
+            self.logger.warning("⚠️ BLOCKED shortcut (strict): %s (%s)", combo, action_name)
+            return SafetyCheck(
+                allowed=False,
+                danger_level=DangerLevel.WARNING,
+                reason=f"Potentially dangerous shortcut ({action_name}): {combo}",
+                action_type="shortcut"
+            )
+        
+        # Guarded so the join is skipped unless debug logging is on
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("⚠️ Allowing warning shortcut: %s (%s)", "+".join(keys), action_name)
+        
+        return _SAFE_CHECK
     
     def check_typed_text(self, text: str, app_name: str = "") -> SafetyCheck:
         """
@@ -259,35 +577,27 @@ class SafetyGuard:
         Returns:
             SafetyCheck with allowed=False if dangerous command detected
         """
-        # Only check in terminal-like apps
-        terminal_apps = {
-            "Terminal", "iTerm", "iTerm2", "Hyper", "Alacritty", 
-            "kitty", "Warp", "Tabby", "Terminus", "Console"
-        }
-        
-        # Also check if it's being typed into a shell-like context
-        is_terminal_context = (
-            app_name in terminal_apps or 
-            "terminal" in app_name.lower() or
-            "console" in app_name.lower() or
-            "shell" in app_name.lower()
-        )
+        # Only check in terminal-like apps, or a shell-like context
+        app_cf = app_name.casefold()
+        is_terminal_context = app_cf in _TERMINAL_APPS_CF or any(m in app_cf for m in _TERMINAL_MARKERS)
         
         if not is_terminal_context:
-            return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+            return _SAFE_CHECK
+        
+        if len(text) > _PREFILTER_MIN_LEN and self._lacks_type_literals(text):
+            return _SAFE_CHECK
         
         # Check against blocked patterns
-        for pattern in self._blocked_type_patterns:
-            if pattern.search(text):
-                self.logger.warning(f"🛑 BLOCKED command: {text[:60]}...")
-                return SafetyCheck(
-                    allowed=False,
-                    danger_level=DangerLevel.BLOCKED,
-                    reason=f"Dangerous command blocked: {text[:50]}...",
-                    action_type="type"
-                )
+        if self._command_blocked(text):
+            self.logger.warning("🛑 BLOCKED command: %s...", text[:60])
+            return SafetyCheck(
+                allowed=False,
+                danger_level=DangerLevel.BLOCKED,
+                reason=f"Dangerous command blocked: {text[:50]}...",
+                action_type="type"
+            )
         
-        return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+        return _SAFE_CHECK
     
     def check_url(self, url: str) -> SafetyCheck:
         """
@@ -300,19 +610,23 @@ class SafetyGuard:
             SafetyCheck with allowed=False if dangerous URL
         """
         if not url:
-            return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+            return _SAFE_CHECK
         
-        for pattern in self._blocked_url_patterns:
-            if pattern.search(url):
-                self.logger.warning(f"🛑 BLOCKED URL: {url}")
-                return SafetyCheck(
-                    allowed=False,
-                    danger_level=DangerLevel.BLOCKED,
-                    reason=f"Dangerous URL blocked: {url}",
-                    action_type="navigate"
-                )
+        if self._url_schemes is not None and url.isascii():
+            url_lower = url.lower()
+            if not any(scheme in url_lower for scheme in self._url_schemes):
+                return _SAFE_CHECK
         
-        return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+        if self._url_blocked(url):
+            self.logger.warning("🛑 BLOCKED URL: %s", url)
+            return SafetyCheck(
+                allowed=False,
+                danger_level=DangerLevel.BLOCKED,
+                reason=f"Dangerous URL blocked: {url}",
+                action_type="navigate"
+            )
+        
+        return _SAFE_CHECK
     
     def check_app_action(self, app_name: str, action_description: str) -> SafetyCheck:
         """
@@ -325,11 +639,14 @@ class SafetyGuard:
         Returns:
             SafetyCheck with allowed=False if dangerous action in sensitive app
         """
-        blocked_keywords = self.BLOCKED_APP_ACTIONS.get(app_name, [])
-        
-        for keyword in blocked_keywords:
-            if keyword.lower() in action_description.lower():
-                self.logger.warning(f"🛑 BLOCKED action in {app_name}: {action_description}")
+        keywords = self._app_action_keywords.get(app_name)
+        if not keywords:
+            return _SAFE_CHECK
+        
+        description_cf = action_description.casefold()
+        for keyword in keywords:
+            if keyword in description_cf:
+                self.logger.warning("🛑 BLOCKED action in %s: %s", app_name, action_description)
                 return SafetyCheck(
                     allowed=False,
                     danger_level=DangerLevel.BLOCKED,
@@ -337,7 +654,7 @@ class SafetyGuard:
                     action_type="app_action"
                 )
         
-        return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+        return _SAFE_CHECK
     
     def check_file_operation(self, path: str, operation: str) -> SafetyCheck:
         """
@@ -350,22 +667,19 @@ class SafetyGuard:
         Returns:
             SafetyCheck with allowed=False if operation on protected path
         """
-        dangerous_operations = {"delete", "remove", "rm", "trash", "unlink", "rmdir"}
+        if operation.lower() not in _DANGEROUS_OPS:
+            return _SAFE_CHECK
         
-        if operation.lower() not in dangerous_operations:
-            return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+        abs_path = _abspath(_expanduser(path))
         
-        import os
-        expanded_path = os.path.expanduser(path)
-        abs_path = os.path.abspath(expanded_path)
+        if abs_path not in self._protected_abs_set and not abs_path.startswith(self._protected_prefixes):
+            return _SAFE_CHECK
         
-        for protected in self.PROTECTED_PATHS:
-            protected_expanded = os.path.expanduser(protected)
-            protected_abs = os.path.abspath(protected_expanded) if not protected.startswith("/") else protected_expanded
+        for protected, protected_abs in self._protected_abs:
             
             # Block if trying to delete the protected path itself
             if abs_path == protected_abs:
-                self.logger.warning(f"🛑 BLOCKED {operation} on protected path: {path}")
+                self.logger.warning("🛑 BLOCKED %s on protected path: %s", operation, path)
                 return SafetyCheck(
                     allowed=False,
                     danger_level=DangerLevel.BLOCKED,
@@ -374,13 +688,13 @@ class SafetyGuard:
                 )
             
             # Block if trying to delete root-level system directories
-            if protected in ["/", "/System", "/Library", "/usr", "/bin", "/sbin", "/etc", "/var", "/private"]:
+            if protected in _SYSTEM_PATHS:
                 if abs_path.startswith(protected_abs + "/") or abs_path == protected_abs:
                     # Allow deleting files deep in user directories
-                    if protected in ["~", "~/Library", "~/Documents", "~/Desktop", "~/Downloads"]:
+                    if protected in _USER_PATHS:
                         # Only block top-level deletion of these
                         if abs_path == protected_abs:
-                            self.logger.warning(f"🛑 BLOCKED {operation} on user directory: {path}")
+                            self.logger.warning("🛑 BLOCKED %s on user directory: %s", operation, path)
                             return SafetyCheck(
                                 allowed=False,
                                 danger_level=DangerLevel.BLOCKED,
@@ -388,7 +702,7 @@ class SafetyGuard:
                                 action_type="file_operation"
                             )
                     else:
-                        self.logger.warning(f"🛑 BLOCKED {operation} in system path: {path}")
+                        self.logger.warning("🛑 BLOCKED %s in system path: %s", operation, path)
                         return SafetyCheck(
                             allowed=False,
                             danger_level=DangerLevel.BLOCKED,
@@ -396,7 +710,7 @@ class SafetyGuard:
                             action_type="file_operation"
                         )
         
-        return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+        return _SAFE_CHECK
     
     def is_safe(
         self,
@@ -411,28 +725,30 @@ class SafetyGuard:
         Convenience method to check multiple safety conditions at once.
         
         Returns the first failed check, or a SAFE check if all pass.
+        Checks run cheapest first, so the typed-text scan comes last.
         """
+        # Every check_* answers a pass with the shared _SAFE_CHECK
         if shortcut:
             check = self.check_shortcut(shortcut)
-            if not check.allowed:
-                return check
-        
-        if typed_text:
-            check = self.check_typed_text(typed_text, app_name)
-            if not check.allowed:
+            if check is not _SAFE_CHECK:
                 return check
         
         if url:
             check = self.check_url(url)
-            if not check.allowed:
+            if check is not _SAFE_CHECK:
                 return check
         
         if file_path and file_operation:
             check = self.check_file_operation(file_path, file_operation)
-            if not check.allowed:
+            if check is not _SAFE_CHECK:
+                return check
+        
+        if typed_text:
+            check = self.check_typed_text(typed_text, app_name)
+            if check is not _SAFE_CHECK:
                 return check
         
-        return SafetyCheck(allowed=True, danger_level=DangerLevel.SAFE)
+        return _SAFE_CHECK
 
 
 # Global instance (non-strict by default for backward compatibility)